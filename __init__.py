@@ -3,8 +3,16 @@ pygame.init()
 
 from . import (
     utils, 
+    controls,
+    memory,
+    render,
+    present,
+    capture,
     ui,
     tile,
+    collision,
     platformer,
+    navigation,
     animation,
+    pool,
 )
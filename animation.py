@@ -4,6 +4,8 @@ import os
 
 import pygame
 
+import pgfwb
+
 def spritesheet_animation_gen(file, cells, frames, tile_size, loop=True):
     """
     Spritesheet Animation Generator
@@ -31,49 +33,166 @@ def spritesheet_animation_gen(file, cells, frames, tile_size, loop=True):
 
         _loop = loop
 
+class Timeline:
+    """
+    Global tick shared by every AnimationManager. ui.screen_refresh
+    advances it once per frame; headless loops advance it themselves.
+    """
+    def __init__(self):
+        self.tick = 0
+
+    def advance(self, ticks=1):
+        self.tick += ticks
+
+timeline = Timeline()
+
+class Clip:
+    """
+    The cells of one spritesheet, cut once and shared by every entity
+    playing it. A frame is looked up from the ticks elapsed since the
+    entity started the clip, so no per-entity state is advanced.
+
+    Cut surfs, and their flipped copies, are cached until memory.ledger
+    evicts the clip for being cold; they are cut again the next time the
+    clip is played.
+    """
+    def __init__(self, file, cells, frames, tile_size, loop=True):
+        self.file = file
+        self.cells = cells
+        self.tile_size = tile_size
+        self.frames = frames
+        self.loop = loop
+        self.length = cells * frames
+        self.last_tick = timeline.tick
+        self._surfs = None
+        clips.append(self)
+
+    @property
+    def surfs(self):
+        if self._surfs is None:
+            spritesheet = pygame.image.load(self.file).convert_alpha()
+            surfs = []
+            for cell_idx in range(self.cells):
+                surf = pygame.Surface((self.tile_size, self.tile_size)).convert_alpha()
+                surf.fill(pygame.Color(0, 0, 0, 0))
+                surf.blit(spritesheet, (-cell_idx * self.tile_size, 0))
+                surfs.append(pgfwb.memory.track(surf, 'animations'))
+
+            self._surfs = surfs
+
+        return self._surfs
+
+    def surf_at(self, elapsed):
+        self.last_tick = timeline.tick
+
+        if self.loop:
+            elapsed %= self.length
+        else:
+            elapsed = min(elapsed, self.length - 1)
+
+        return self.surfs[elapsed // self.frames]
+
+    def evict(self):
+        # entities may still hold a frame until their next lookup, drop
+        # its flipped copy now so eviction frees it as well
+        for surf in self._surfs or ():
+            pgfwb.render.flipped_surfs.pop(surf, None)
+
+        self._surfs = None
+
+clips = []
+
+def evict_coldest_clip():
+    """Evicts the loaded clip that was played longest ago, skipping clips played this tick"""
+    cold = [clip for clip in clips
+            if clip._surfs is not None and clip.last_tick < timeline.tick]
+
+    if not cold:
+        return False
+
+    min(cold, key=lambda clip: clip.last_tick).evict()
+    return True
+
+pgfwb.memory.ledger.register_cache(evict_coldest_clip)
+
+@functools.cache
+def load_clips(folder, frames):
+    """
+    Clips for every spritesheet in folder keyed by animation name.
+    Spritesheet files are named <anything>-<animation_name>.png
+    """
+    clips = {}
+    for filename in sorted(os.listdir(folder)):
+        spritesheet_file = f"{folder}/{filename}"
+
+        width, tile_size = pygame.image \
+                                 .load(spritesheet_file) \
+                                 .get_size()
+
+        animation_name = filename.split("-")[-1] \
+                                 .split(".")[0]
+
+        clips[animation_name] = Clip(
+            file=spritesheet_file,
+            cells=width // tile_size,
+            frames=frames,
+            tile_size=tile_size,
+        )
+
+    return clips
+
 class AnimationManager:
     def __init__(self, folder, frames=8):
         self.folder = f"animations/{folder}"
-        self.animations = {}
         self.frames = frames
-        self._animation = None
+        self.animations = load_clips(self.folder, frames)
         self.animation_name = None
+        self.clip = None
+        self.start_tick = 0
 
-        for filename in os.listdir(self.folder):
-            spritesheet_file = f"{self.folder}/{filename}"
-
-            width, tile_size = pygame.image \
-                                     .load(spritesheet_file) \
-                                     .get_size()
+        self.animation = next(iter(self.animations))
 
-            cells = width // tile_size
-
-            animation_name = filename.split("-")[-1] \
-                                     .split(".")[0]
+    def next(self):
+        return self.surf
 
-            self.animation_name = animation_name
+    def restart(self):
+        self.start_tick = timeline.tick
 
-            self.animations[animation_name] = functools.partial(
-                spritesheet_animation_gen,
-                file=spritesheet_file,
-                cells=cells,
-                frames=self.frames,
-                tile_size=tile_size
-            )
+    @property
+    def surf(self):
+        return self.clip.surf_at(timeline.tick - self.start_tick)
 
-            if not self._animation:
-                self.animation = animation_name
-            
+    @property
+    def phase(self):
+        if self.clip.loop:
+            return self.start_tick % self.clip.length
 
-    def next(self):
-        return next(self.animation)
+        return self.start_tick
 
     @property
     def animation(self):
-        return self._animation
+        return self.animation_name
 
     @animation.setter
     def animation(self, animation_name):
-        self.animation_name = animation_name
-        self._animation = self.animations[animation_name]()
+        """Switching clips restarts them; setting the current clip is a no-op"""
+        if animation_name != self.animation_name:
+            self.animation_name = animation_name
+            self.clip = self.animations[animation_name]
+            self.start_tick = timeline.tick
+
+def advance_all(entities):
+    """
+    Bring the surf of every animated entity up to the shared tick.
+    Entities playing the same clip in the same phase share one lookup.
+    """
+    lookups = {}
+    for entity in entities:
+        if (manager := entity.animation_manager) is None:
+            continue
+
+        key = (manager.clip, manager.phase)
+        if (surf := lookups.get(key)) is None:
+            surf = lookups[key] = manager.surf
 
+        entity.surf = surf
@@ -0,0 +1,149 @@
+"""
+Micro benchmarks for the render paths. Run from a game folder with a
+settings module:
+
+    python -m pgfwb.benchmark
+"""
+import functools
+import time
+
+import pygame
+import settings
+
+import pgfwb
+
+def timed(fn, frames):
+    start = time.perf_counter()
+    for _ in range(frames):
+        fn()
+    return (time.perf_counter() - start) / frames * 1000
+
+def tile_scene(count, tile_partial=pgfwb.tile.Tile):
+    tilemap = pgfwb.tile.TileMap()
+    side = int(count ** 0.5)
+    for idx in range(count):
+        tilemap.add((idx % side, idx // side), tile_partial)
+
+    return tilemap, pgfwb.tile.Camera(next(iter(tilemap.tiles.values())))
+
+def bench_blits(count=10_000, frames=30):
+    """Milliseconds per frame for a count tile scene blitted per tile vs batched"""
+    target = pgfwb.ui.display
+    tilemap, camera = tile_scene(count)
+    queue = pgfwb.render.RenderQueue()
+
+    width, height = target.get_size()
+
+    def per_object():
+        # culled the way the batched path culls, so only batching is compared
+        for tile in tilemap.tiles.values():
+            x, y = camera.offset_pos(tile.rect.topleft)
+            if -settings.TILESIZE < x < width and -settings.TILESIZE < y < height:
+                tile.render(target, camera)
+
+    def batched():
+        tilemap.render(queue, camera)
+        queue.flush(target)
+
+    # the first frames create the tile surfs and the render cache
+    per_object()
+    batched()
+
+    return {
+        'blit': timed(per_object, frames),
+        'blits': timed(batched, frames),
+    }
+
+def bench_color_runs(count=10_000, frames=30):
+    """Milliseconds per frame for a count ColorTile scene, one surf per tile vs fill runs"""
+    target = pgfwb.ui.display
+    colors = ('red', 'green', 'blue')
+    tilemap = pgfwb.tile.TileMap()
+    side = int(count ** 0.5)
+    for idx in range(count):
+        x, y = idx % side, idx // side
+        tilemap.add((x, y), functools.partial(pgfwb.tile.ColorTile, color=colors[y // 8 % 3]))
+
+    camera = pgfwb.tile.Camera(next(iter(tilemap.tiles.values())))
+    surfs = [(tile.surf, tile.rect) for tile in tilemap.tiles.values()]
+    queue = pgfwb.render.RenderQueue()
+
+    def per_tile():
+        for surf, rect in surfs:
+            target.blit(surf, camera.offset_pos(rect.topleft))
+
+    def runs():
+        tilemap.render(queue, camera)
+        queue.flush(target)
+
+    return {
+        'surfs': timed(per_tile, frames),
+        'runs': timed(runs, frames),
+    }
+
+def bench_formats(count=2_000, frames=30):
+    """Milliseconds per frame for count text and 24 bit blits, unconverted vs prepared"""
+    target = pgfwb.ui.display
+    raw = [
+        pgfwb.ui.font.render('HELLO', False, 'white'),
+        pygame.Surface((32, 32), depth=24),
+    ]
+    prepared = [pgfwb.render.prepare(surf) for surf in raw]
+
+    def blit_all(surfs):
+        target.blits(
+            [(surfs[idx % len(surfs)], (idx % 480, idx % 480)) for idx in range(count)],
+            doreturn=False,
+        )
+
+    return {
+        'unconverted': timed(lambda: blit_all(raw), frames),
+        'prepared': timed(lambda: blit_all(prepared), frames),
+    }
+
+def bench_layers(count=10_000, frames=30):
+    """Milliseconds per frame for a count tile parallax background, drawn per tile vs baked"""
+    target = pgfwb.ui.display
+    tilemap, camera = tile_scene(1)
+    side = int(count ** 0.5)
+    layers = {}
+
+    for name, static in (('tiles', False), ('baked', True)):
+        layer = tilemap.add_layer(pgfwb.tile.TileLayer(name, parallax=0.5, static=static, wrap=True))
+        for idx in range(count):
+            layer.add((idx % side, idx // side), pgfwb.tile.Tile)
+        layers[name] = layer
+
+    queue = pgfwb.render.RenderQueue()
+
+    def draw(layer):
+        camera.render_scroll.x += 7
+        layer.render(queue, camera)
+        queue.flush(target)
+
+    results = {}
+    for name, layer in layers.items():
+        # the first frame bakes the visible chunks
+        draw(layer)
+        results[name] = timed(functools.partial(draw, layer), frames)
+
+    return results
+
+def bench_present(frames=60):
+    """Milliseconds per frame to get the display onto the window, per present backend"""
+    display = pgfwb.ui.display
+    results = {}
+
+    for name, presenter_class in pgfwb.present.backends.items():
+        try:
+            presenter = presenter_class(display.get_size(), settings.DISPLAY_SCALE)
+        except (ImportError, RuntimeError):
+            continue
+        results[name] = timed(lambda: presenter.present(display), frames)
+
+    return results
+
+if __name__ == '__main__':
+    for bench in (bench_blits, bench_color_runs, bench_formats, bench_layers, bench_present):
+        for name, ms in bench().items():
+            print(f"{bench.__name__} {name}: {ms:.2f} ms/frame")
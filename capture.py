@@ -0,0 +1,129 @@
+"""
+The Capture module records the display to disk without stalling the game
+loop.
+
+Design choices:
+    - frames are blitted into a ring of preallocated surfaces with the
+      display's format, so grabbing a frame is a single same format copy
+    - a writer thread saves filled slots and hands them back; when no slot
+      is free the frame is dropped and counted instead of waiting
+    - 'png' writes frame_<frame>.png, so dropped frames show as gaps in
+      the numbering; 'raw' appends the pixel buffers to capture.raw and
+      describes them in capture.json
+    - a raw stream keeps one buffer per grabbed frame: the frame written
+      after a gap is repeated over the dropped ones (and the last frame
+      over trailing drops), so it plays back with the game's timing;
+      capture.json lists the dropped frame numbers
+
+Usage:
+    pgfwb.ui.start_capture('captures')
+    ...
+    stats = pgfwb.ui.stop_capture()
+
+A raw stream can be encoded afterwards with, for 32 bit displays:
+    ffmpeg -f rawvideo -pixel_format bgr0 -video_size 512x512 -i capture.raw out.mp4
+"""
+import json
+import os
+import queue
+import threading
+
+import pygame
+
+from pgfwb import memory
+
+class Capture:
+    def __init__(self, folder, display, slots=8, mode='png'):
+        self.folder = folder
+        self.mode = mode
+        self.ring = [memory.track(display.copy(), 'scratch') for _ in range(slots)]
+        self.free = queue.Queue()
+        self.filled = queue.Queue()
+        for idx in range(slots):
+            self.free.put(idx)
+
+        self.frame = 0
+        self.dropped = 0
+        self.dropped_frames = []
+        self.written = 0
+        self.duplicated = 0
+        self.last = None
+
+        os.makedirs(folder, exist_ok=True)
+        self.raw = open(os.path.join(folder, 'capture.raw'), 'wb') if mode == 'raw' else None
+
+        self.thread = threading.Thread(target=self.write_loop, daemon=True)
+        self.thread.start()
+
+    def grab(self, display):
+        """Copy display into a free slot. Returns False when the frame was dropped."""
+        frame = self.frame
+        self.frame += 1
+
+        try:
+            idx = self.free.get_nowait()
+        except queue.Empty:
+            self.dropped += 1
+            self.dropped_frames.append(frame)
+            return False
+
+        self.ring[idx].blit(display, (0, 0))
+        self.filled.put((frame, idx))
+        return True
+
+    def write_loop(self):
+        while (item := self.filled.get()) is not None:
+            frame, idx = item
+            self.write(frame, self.ring[idx])
+            self.written += 1
+            self.last = item
+            self.free.put(idx)
+
+    def write(self, frame, surf):
+        if self.raw:
+            # once more for every frame dropped since the last one written
+            copies = frame - (self.last[0] if self.last else -1)
+            self.write_raw(surf, copies)
+            self.duplicated += copies - 1
+        else:
+            pygame.image.save(surf, os.path.join(self.folder, f"frame_{frame:06}.png"))
+
+    def write_raw(self, surf, copies=1):
+        view = surf.get_view('0')
+        for _ in range(copies):
+            self.raw.write(view)
+
+    def close(self):
+        """Write out every grabbed frame and stop the writer. Returns the stats."""
+        self.filled.put(None)
+        self.thread.join()
+
+        if self.raw:
+            # no frame was grabbed into the last written slot since, so it
+            # still holds that frame to repeat over the trailing drops
+            if self.last and (trailing := self.frame - 1 - self.last[0]):
+                self.write_raw(self.ring[self.last[1]], trailing)
+                self.duplicated += trailing
+
+            self.raw.close()
+            surf = self.ring[0]
+            with open(os.path.join(self.folder, 'capture.json'), 'w') as fp:
+                json.dump({
+                    'size': surf.get_size(),
+                    'pitch': surf.get_pitch(),
+                    'bytesize': surf.get_bytesize(),
+                    'masks': surf.get_masks(),
+                    **self.stats,
+                    'dropped_frames': self.dropped_frames,
+                }, fp, indent=2)
+
+        return self.stats
+
+    @property
+    def stats(self):
+        return {
+            'frames': self.frame,
+            'written': self.written,
+            'dropped': self.dropped,
+            'duplicated': self.duplicated,
+        }
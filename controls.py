@@ -0,0 +1,106 @@
+"""
+The Controls module maps key events to named actions and keeps their per
+frame state.
+
+Design choices:
+    - bindings are {action: [keys]}; events are dispatched through a dict
+      keyed by (event type, key), so handling an event is one lookup
+    - pressed and released only hold the edges seen since begin_frame,
+      held is the state that persists between frames; every KEYDOWN is a
+      press, so key repeat (pygame.key.set_repeat) repeats actions
+    - when a scene takes over input from another one it calls sync, which
+      rebuilds held from pygame.key.get_pressed() once instead of posting
+      synthetic events (see utils.preserve_keys); hand_back syncs every
+      other live ActionMap when that scene returns, and on_sync lets their
+      owner apply the new state right away
+    - loops fetch events through get_events, so an active recorder (see
+      replay.Recorder) sees exactly what the game consumed
+
+Usage:
+    actions = ActionMap({'jump': [pygame.K_SPACE]})
+
+    while True:
+        actions.begin_frame()
+        for event in get_events():
+            quit_handler(event)
+            actions.process(event)
+
+        if actions.is_pressed('jump'):
+            ...
+"""
+import weakref
+
+import pygame
+
+recorder = None
+action_maps = weakref.WeakSet()
+
+def get_events():
+    """pygame.event.get(), passed through the active recorder"""
+    events = pygame.event.get()
+    if recorder:
+        recorder.record(events)
+
+    return events
+
+def hand_back(scene_actions):
+    """Syncs every ActionMap but scene_actions, for a scene returning the keyboard"""
+    for actions in list(action_maps):
+        if actions is not scene_actions:
+            actions.sync()
+
+class ActionMap:
+    def __init__(self, bindings, on_sync=None):
+        self.bindings = bindings
+        self.on_sync = on_sync
+        self.dispatch = {}
+        for action, keys in bindings.items():
+            for key in keys:
+                self.dispatch[(pygame.KEYDOWN, key)] = (action, True)
+                self.dispatch[(pygame.KEYUP, key)] = (action, False)
+
+        self.held = set()
+        self.pressed = set()
+        self.released = set()
+        action_maps.add(self)
+
+    def begin_frame(self):
+        self.pressed.clear()
+        self.released.clear()
+
+    def process(self, event):
+        """Updates action state from event. Returns the bound action or None."""
+        if (entry := self.dispatch.get((event.type, getattr(event, 'key', None)))) is None:
+            return None
+
+        action, down = entry
+        if down:
+            self.pressed.add(action)
+            self.held.add(action)
+        else:
+            self.held.discard(action)
+            self.released.add(action)
+
+        return action
+
+    def sync(self):
+        """
+        Rebuilds held from the keyboard, without pressed or released edges,
+        for a scene that is (re)gaining input from another scene
+        """
+        keys = pygame.key.get_pressed()
+        self.held = {action for action, bound in self.bindings.items()
+                     if any(keys[key] for key in bound)}
+        self.begin_frame()
+
+        if self.on_sync:
+            self.on_sync()
+
+    def is_pressed(self, action):
+        return action in self.pressed
+
+    def is_held(self, action):
+        return action in self.held
+
+    def is_released(self, action):
+        return action in self.released
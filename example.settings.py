@@ -5,3 +5,9 @@ HEIGHT = 512
 WIDTH = 512
 TILESIZE = 32
 DISPLAY_SCALE = 2
+
+# Bytes of Surface memory kept before cold cached assets are evicted
+SURFACE_BUDGET = None
+
+# 'surface' scales the display on the CPU, 'renderer' hands it to an SDL renderer
+PRESENT_BACKEND = 'surface'
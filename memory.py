@@ -0,0 +1,77 @@
+"""
+The Memory module accounts for the pixel memory held by Surfaces.
+
+Design choices:
+    - surfaces are tracked at creation with a category (tiles, entities,
+      animations, ui, scratch) and untracked automatically when they are
+      garbage collected
+    - caches that can rebuild their surfaces on demand register an evict
+      callable; when the tracked total passes the budget the coldest
+      entries are evicted until it fits again
+    - the budget comes from settings.SURFACE_BUDGET (bytes), None for no limit
+"""
+import weakref
+
+import settings
+
+class SurfaceLedger:
+    def __init__(self, budget=None):
+        self.budget = budget
+        self.bytes = {}
+        self.peaks = {}
+        self.peak_total = 0
+        self.total = 0
+        self.caches = []
+        self.evictions = 0
+
+    def track(self, surf, category):
+        """Count surf's pixel bytes under category. Returns surf."""
+        size = surf.get_pitch() * surf.get_height()
+        self.bytes[category] = self.bytes.get(category, 0) + size
+        self.peaks[category] = max(self.peaks.get(category, 0), self.bytes[category])
+        self.total += size
+        self.peak_total = max(self.peak_total, self.total)
+        weakref.finalize(surf, self.untrack, category, size)
+
+        if self.budget is not None and self.total > self.budget:
+            self.enforce()
+
+        return surf
+
+    def untrack(self, category, size):
+        self.bytes[category] -= size
+        self.total -= size
+
+    def register_cache(self, evict):
+        """
+        evict() releases the coldest entry of a cache and returns False
+        once it has nothing left to release.
+        """
+        self.caches.append(evict)
+
+    def enforce(self):
+        for evict in self.caches:
+            while self.total > self.budget and evict():
+                self.evictions += 1
+
+    def report(self):
+        return {
+            'bytes': dict(self.bytes),
+            'peaks': dict(self.peaks),
+            'total': self.total,
+            'peak_total': self.peak_total,
+            'budget': self.budget,
+            'evictions': self.evictions,
+        }
+
+    def report_lines(self):
+        """Short text lines for the debug overlay"""
+        lines = [f"{category[:5]} {size // 1024}k/{self.peaks[category] // 1024}k"
+                 for category, size in sorted(self.bytes.items())]
+        lines.append(f"total {self.total // 1024}k/{self.peak_total // 1024}k")
+
+        return lines
+
+ledger = SurfaceLedger(budget=getattr(settings, 'SURFACE_BUDGET', None))
+
+track = ledger.track
@@ -0,0 +1,184 @@
+"""
+The Navigation module builds a graph of where a platformer entity can go
+on a PlatformerTileMap and finds paths through it with A*.
+
+Design choices:
+    - a node is a walkable coord: an empty cell with a solid tile below it
+    - links are walk (to a side neighbor), fall (off a ledge down a column)
+      and jump (to any node in reach of the entity's jump arc)
+    - jump reach comes from the same per frame physics PhysicsEntity uses,
+      so graphs are built per (movespeed, jumpforce, gravity, maxfallspeed)
+    - edits only rebuild the columns within reach of the edited coord, and
+      clear the path cache
+"""
+import heapq
+import math
+
+import settings
+
+import pgfwb
+
+WALK = 'walk'
+FALL = 'fall'
+JUMP = 'jump'
+
+# How far below its start a jump link may land, in tiles
+MAX_JUMP_DROP = 4
+
+def jump_arc(jumpforce, gravity, maxfallspeed):
+    """
+    (frame, y) for each frame of a jump, y in pixels relative to the start
+    (negative is up), until the arc falls MAX_JUMP_DROP tiles below it
+    """
+    arc = []
+    y, movey, frame = 0, -jumpforce, 0
+    while y < MAX_JUMP_DROP * settings.TILESIZE and frame < 1000:
+        movey = min(maxfallspeed, movey + gravity)
+        y += movey
+        frame += 1
+        arc.append((frame, y))
+
+    return arc
+
+class NavGraph:
+    def __init__(self, tilemap, movespeed, jumpforce, gravity, maxfallspeed):
+        self.tilemap = tilemap
+        self.movespeed = movespeed
+        self.arc = jump_arc(jumpforce, gravity, maxfallspeed)
+        self.peak = min(range(len(self.arc)), key=lambda idx: self.arc[idx][1])
+        self.rise = max(0, -self.arc[self.peak][1]) // settings.TILESIZE
+        self.reach = math.ceil(movespeed * self.arc[-1][0] / settings.TILESIZE)
+        self.nodes = set()
+        self.edges = {}
+        self.paths = {}
+        self.build()
+
+    def solid(self, coord):
+        return (tile := self.tilemap.collision_tiles.get(coord)) is not None and pgfwb.tile.collides(tile)
+
+    def is_node(self, coord):
+        return not self.solid(coord) and self.solid((coord[0], coord[1] + 1))
+
+    def build(self):
+        self.bottom = max((coord[1] for coord in self.tilemap.collision_tiles), default=0)
+        self.nodes = {(x, y - 1) for x, y in self.tilemap.collision_tiles
+                      if self.is_node((x, y - 1))}
+        self.edges = {node: self.links(node) for node in self.nodes}
+        self.paths = {}
+
+    def invalidate(self, coord):
+        """Rebuild nodes next to coord and links of every node within reach of it"""
+        self.bottom = max(self.bottom, coord[1])
+        x = coord[0]
+
+        for y in (coord[1] - 1, coord[1]):
+            if self.is_node((x, y)):
+                self.nodes.add((x, y))
+            else:
+                self.nodes.discard((x, y))
+                self.edges.pop((x, y), None)
+
+        near = range(x - self.reach - 1, x + self.reach + 2)
+        for node in [node for node in self.nodes if node[0] in near]:
+            self.edges[node] = self.links(node)
+
+        self.paths = {}
+
+    def links(self, node):
+        """(node, cost, kind) for every link out of node"""
+        x, y = node
+        links = []
+
+        for side in (-1, 1):
+            beside = (x + side, y)
+            if beside in self.nodes:
+                links.append((beside, 1, WALK))
+            elif not self.solid(beside):
+                # drop down the column beside the ledge
+                for drop in range(y + 1, self.bottom + 1):
+                    if (x + side, drop) in self.nodes:
+                        links.append(((x + side, drop), 1 + (drop - y) / 2, FALL))
+                        break
+                    if self.solid((x + side, drop)):
+                        break
+
+        if self.solid((x, y - 1)):
+            return links
+
+        for dx in range(-self.reach, self.reach + 1):
+            for dy in range(-self.rise, MAX_JUMP_DROP + 1):
+                other = (x + dx, y + dy)
+                if abs(dx) <= 1 and dy >= 0 or other not in self.nodes:
+                    continue
+
+                if self.can_jump(node, other):
+                    links.append((other, abs(dx) + abs(dy) + 1, JUMP))
+
+        return links
+
+    def can_jump(self, node, other):
+        """The arc can carry the entity to other and the straight line there is clear"""
+        dx = abs(other[0] - node[0]) * settings.TILESIZE
+        dy = (other[1] - node[1]) * settings.TILESIZE
+        if self.arc[self.peak][1] > dy:
+            return False
+
+        frame = next((frame for frame, y in self.arc[self.peak:] if y >= dy), None)
+        if frame is None or self.movespeed * frame < dx:
+            return False
+
+        # the entity starts the jump from above the cell it stands in
+        start = pgfwb.tile.coord_to_pos((node[0], node[1] - 1 if dy < 0 else node[1]))
+        goal = pgfwb.tile.coord_to_pos(other)
+        half = settings.TILESIZE // 2
+        return self.tilemap.line_of_sight(
+            (start[0] + half, start[1] + half),
+            (goal[0] + half, goal[1] + half),
+        )
+
+    def node_at(self, rect):
+        """The node an entity's rect stands on, or None when it is airborne"""
+        coord = pgfwb.tile.pos_to_coord((rect.centerx, rect.bottom - 1))
+        return coord if coord in self.nodes else None
+
+    def nearest_node(self, coord):
+        return min(self.nodes, default=None,
+                   key=lambda node: abs(node[0] - coord[0]) + abs(node[1] - coord[1]))
+
+    def path(self, start, goal):
+        """
+        A* from start to goal node. Returns a list of (node, kind) steps
+        that starts with (start, None), or None when goal can't be reached.
+        """
+        key = (start, goal)
+        if key not in self.paths:
+            self.paths[key] = self.search(start, goal)
+
+        return self.paths[key]
+
+    def search(self, start, goal):
+        if start not in self.nodes or goal not in self.nodes:
+            return None
+
+        came_from = {start: (None, None)}
+        costs = {start: 0}
+        frontier = [(abs(goal[0] - start[0]), start)]
+
+        while frontier:
+            _, node = heapq.heappop(frontier)
+            if node == goal:
+                steps = []
+                while node is not None:
+                    previous, kind = came_from[node]
+                    steps.append((node, kind))
+                    node = previous
+                return steps[::-1]
+
+            for other, cost, kind in self.edges.get(node, ()):
+                new_cost = costs[node] + cost
+                if new_cost < costs.get(other, math.inf):
+                    costs[other] = new_cost
+                    came_from[other] = (node, kind)
+                    heapq.heappush(frontier, (new_cost + abs(goal[0] - other[0]), other))
+
+        return None
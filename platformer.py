@@ -17,6 +17,8 @@ class Moving:
         return self.left or self.right
 
 class PhysicsEntity:
+    layer = pgfwb.render.ENTITY_LAYER
+
     def __init__(
         self, 
         pos=None, 
@@ -45,19 +47,23 @@ class PhysicsEntity:
         self.height = height
 
 
-        self.surf = pygame.Surface((width, height))
+        self.surf = pgfwb.memory.track(
+            pgfwb.render.prepare(pygame.Surface((width, height))),
+            'entities',
+        )
 
         self.color = color
         if color: 
             self.surf.fill(color)
 
         self.folder = folder
+        self.animation_manager = None
         if folder:
             self.animation_manager = pgfwb.animation.AnimationManager(
                 folder=folder
             )
 
-            self.surf = self.animation_manager.next()
+            self.surf = self.animation_manager.surf
 
         self.surf_rect = self.surf.get_rect()
         self.surf_rect.x, self.surf_rect.y = pos
@@ -85,49 +91,77 @@ class PhysicsEntity:
             if self.air_frames > 0:
                 self.animation_manager.animation = 'jumping'
             elif self.moving:
-                if self.animation_manager.animation_name != 'walking':
-                    self.animation_manager.animation = 'walking'
-            elif self.animation_manager.animation_name != 'standing':
+                self.animation_manager.animation = 'walking'
+            else:
                 self.animation_manager.animation = 'standing'
 
-            self.surf = self.animation_manager.next()
+            self.surf = self.animation_manager.surf
+
+    def sync_rect(self):
+        """
+        Moves rect to pos when pos was assigned directly (a portal, a
+        respawn, EntityPool.acquire). Sweeps start from rect, so the
+        update methods call this before moving.
+        """
+        topleft = (int(self.pos.x), int(self.pos.y))
+        if self.rect.topleft != topleft:
+            self.rect.topleft = topleft
+
+    @property
+    def reach(self):
+        """Rect grown by the farthest the entity can move in a frame, for TileMap.rects_in"""
+        rect = pygame.Rect((int(self.pos.x), int(self.pos.y)), self.rect.size)
+        return rect.inflate(
+            2 * self.movespeed + 2,
+            2 * max(self.maxfallspeed, self.jumpforce) + 2,
+        )
 
     def update_horizontal(self, rects):
         """
-        Move horizontally and handle horizontal collisions
+        Move horizontally and handle horizontal collisions. The move is
+        swept, so it stops at the first rect along it however fast it is.
         """
+        self.sync_rect()
         movex = self.moving.right - self.moving.left
-        self.pos.x += movex * self.movespeed
-        self.rect.x = int(self.pos.x)
-        
-        if (idx := self.rect.collidelist(rects)) != -1:
-            other_rect = rects[idx]
-            if movex > 0:
-                self.rect.right = other_rect.left
-            else:
-                self.rect.left = other_rect.right
-            self.pos.x = self.rect.x
+        x = self.pos.x + movex * self.movespeed
+
+        if (hit := pgfwb.collision.sweep(self.rect, (int(x) - self.rect.x, 0), rects)) is None:
+            self.pos.x = x
+            self.rect.x = int(x)
+            return
+
+        other_rect = rects[hit[1]]
+        if movex > 0:
+            self.rect.right = other_rect.left
+        else:
+            self.rect.left = other_rect.right
+        self.pos.x = self.rect.x
 
     def update_vertical(self, rects):
         """
-        Move vertically and handle vertical collisions
+        Move vertically and handle vertical collisions, swept like
+        update_horizontal.
         Manages air_frames to determine if the player should be able to jump.
         """
+        self.sync_rect()
         self.air_frames += 1
         self.movey = min(self.maxfallspeed, self.movey + self.gravity)
-        self.pos.y += self.movey
-        self.rect.y = int(self.pos.y)
-
-        if (idx := self.rect.collidelist(rects)) != -1:
-            other_rect = rects[idx]
-            if self.movey > 0:
-                self.rect.bottom = other_rect.top
-                self.movey = self.gravity
-                self.air_frames = 0
-            else:
-                self.rect.top = other_rect.bottom
-                self.movey = 0
-            self.pos.y = self.rect.y
+        y = self.pos.y + self.movey
+
+        if (hit := pgfwb.collision.sweep(self.rect, (0, int(y) - self.rect.y), rects)) is None:
+            self.pos.y = y
+            self.rect.y = int(y)
+            return
+
+        other_rect = rects[hit[1]]
+        if self.movey > 0:
+            self.rect.bottom = other_rect.top
+            self.movey = self.gravity
+            self.air_frames = 0
+        else:
+            self.rect.top = other_rect.bottom
+            self.movey = 0
+        self.pos.y = self.rect.y
 
     def jump(self):
         self.movey = -self.jumpforce
@@ -146,66 +180,102 @@ class PhysicsEntity:
         self.moving.right = False
         self.moving.left = False
 
-    def render(self, target=pgfwb.ui.display, camera=None):
+    def draw_items(self):
         """
-        Blit current surf to the target. This function creates a rectangle based 
-        on the size of the surf. The rect of the entity represents the hitbox, 
-        but we don't want to offset how the image is blitting based on this.
+        (surf, world pos, layer) for each surf the entity draws. TileMap
+        offsets the entities stored in it in one Camera.offset_many batch.
+
+        The surf rect is built from the size of the surf. The rect of the
+        entity represents the hitbox, but we don't want to offset how the
+        image is blitting based on this.
         """
         if self.active:
-            _surf = self.surf.copy()
+            _surf = self.surf
             if self.flip:
-                _surf = pygame.transform.flip(_surf, True, False)
+                category = 'animations' if self.animation_manager else 'entities'
+                _surf = pgfwb.render.flipped(_surf, category)
 
             self.surf_rect = self.surf.get_rect(bottom=self.rect.bottom)
             self.surf_rect.centerx = self.rect.centerx
 
-            if camera:
-                target.blit(_surf, camera.offset_rect(self.surf_rect))
-            else:
-                target.blit(_surf, self.surf_rect)
+            yield _surf, self.surf_rect.topleft, self.layer
+
+    def render(self, target=pgfwb.ui.render_queue, camera=None):
+        """Blit current surf to the target"""
+        for surf, pos, layer in self.draw_items():
+            pgfwb.render.draw(target, surf, camera.offset_pos(pos) if camera else pos, layer)
+
+PLAYER_BINDINGS = {
+    'left': [pygame.K_LEFT],
+    'right': [pygame.K_RIGHT],
+    'jump': [pygame.K_SPACE],
+    'shoot': [pygame.K_LSHIFT],
+}
 
 class Player(PhysicsEntity):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self. bullets = [
-            pgfwb.platformer.Bullet(
-                folder='bullet', 
-                width=6, 
-                height=6,
-                movespeed=4,
-            ) 
-            for _ in range(3)
-        ]
+        self.bullets = pgfwb.pool.EntityPool(
+            Bullet,
+            3,
+            grow=False,
+            folder='bullet',
+            width=6,
+            height=6,
+            movespeed=4,
+        )
+        self.actions = pgfwb.controls.ActionMap(PLAYER_BINDINGS, on_sync=self.control)
 
     def event_controls(self, event):
-        if event.type == pygame.KEYDOWN:
-            if event.key == pygame.K_LEFT:
-                self.move_left()
-            if event.key == pygame.K_RIGHT:
-                self.move_right()
-            if event.key == pygame.K_SPACE:
-                if self.air_frames <= 6:
-                    self.jump()
-            if event.key == pygame.K_LSHIFT:
-                bullet = next((x for x in self.bullets if not x.active), None)
-                if bullet:
-                    bullet.flip = self.flip
-                    bullet.active = True
-                    bullet.pos = self.pos.copy()
-                    bullet.frames = 0
-
-        if event.type == pygame.KEYUP:
-            if event.key == pygame.K_LEFT:
-                self.moving.left = False
-            if event.key == pygame.K_RIGHT:
-                self.moving.right = False
-
-    def render(self, target=pgfwb.ui.display, camera=None):
-        super().render(target, camera)
+        """Applies a single event right away, for loops that don't keep per frame action state"""
+        self.actions.begin_frame()
+        if self.actions.process(event):
+            self.control()
+
+    def resume_controls(self):
+        """
+        Rebuilds held from the keyboard and applies it (through on_sync),
+        so keys pressed or released while another scene had the keyboard
+        take effect right away instead of on the next bound key event.
+        The ui loops do this when they return (controls.hand_back); call it
+        after scenes of your own that read the keyboard.
+        """
+        self.actions.sync()
+
+    def control(self):
+        """
+        Applies the current action state. Movement follows held; see
+        resume_controls for picking up keys changed while another scene
+        had the keyboard.
+        """
+        left = self.actions.is_held('left')
+        right = self.actions.is_held('right')
+
+        if self.actions.is_pressed('left') or left and not right:
+            self.move_left()
+        elif self.actions.is_pressed('right') or right and not left:
+            self.move_right()
+        elif not left and not right:
+            self.stand()
+
+        if self.actions.is_pressed('jump') and self.air_frames <= 6:
+            self.jump()
+
+        if self.actions.is_pressed('shoot'):
+            self.shoot()
+
+    def shoot(self):
+        return self.bullets.acquire(
+            flip=self.flip,
+            pos=self.pos.copy(),
+            frames=0,
+        )
+
+    def draw_items(self):
+        yield from super().draw_items()
 
         for bullet in self.bullets:
-            bullet.render(target, camera)
+            yield from bullet.draw_items()
 
 
 class Bullet(PhysicsEntity):
@@ -218,83 +288,298 @@ class Bullet(PhysicsEntity):
     def update(self, rects, enemy_rects):
         if self.active:
             self.update_horizontal(rects, enemy_rects)
-            super().update_vertical(rects)
+            self.finish_update(rects)
 
-            if self.flip:
-                self.move_left()
-            else:
-                self.move_right()
+    def finish_update(self, rects):
+        """Everything in update after the horizontal move"""
+        super().update_vertical(rects)
+
+        if self.flip:
+            self.move_left()
+        else:
+            self.move_right()
 
-            self.frames += 1
-            if self.frames > 60:
-                self.active = False
+        self.frames += 1
+        if self.frames > 60:
+            self.active = False
 
     def update_horizontal(self, rects, enemies):
         """
-        Move horizontally and handle horizontal collisions
+        Move horizontally and stop at the first wall or active enemy along
+        the move, taking the enemy down with it
         """
+        self.sync_rect()
         movex = self.moving.right - self.moving.left
-        self.pos.x += movex * self.movespeed
-        self.rect.x = int(self.pos.x)
-        
-        if (idx := self.rect.collidelist(rects)) != -1:
-            self.active = False
+        x = self.pos.x + movex * self.movespeed
+        enemies = [enemy for enemy in enemies if enemy.active]
 
-        enemy_rects = [x.rect for x in enemies]
-        if (idx := self.rect.collidelist(enemy_rects)) != -1:
-            self.active = False
-            enemy = enemies[idx]
-            enemy.active = False
+        hit = pgfwb.collision.sweep(
+            self.rect,
+            (int(x) - self.rect.x, 0),
+            rects + [enemy.rect for enemy in enemies],
+        )
+        self.pos.x = x
+        self.rect.x = int(x)
+
+        if hit is not None:
+            self.hit(hit[1] - len(rects), enemies)
+
+    def hit(self, enemy_idx, enemies):
+        """Deactivate on a hit, enemy_idx is negative for a wall"""
+        self.active = False
+        if enemy_idx >= 0:
+            enemies[enemy_idx].active = False
 
     def update_animation(self):
         ...
 
-    def render(self, target=pgfwb.ui.display, camera=None):
-        if self.active:
-            super().render(target, camera)
+def update_bullets(bullets, tilemap, enemies, key=pgfwb.tile.collides):
+    """
+    Bullet.update for many bullets, with the horizontal sweeps against
+    walls and active enemies done in one collision.sweep_many pass
+    """
+    bullets = [bullet for bullet in bullets if bullet.active]
+    if not bullets:
+        return
+
+    for bullet in bullets:
+        bullet.sync_rect()
+
+    enemies = [enemy for enemy in enemies if enemy.active]
+    enemy_rects = [enemy.rect for enemy in enemies]
+    rects = tilemap.rects_in_many([bullet.reach for bullet in bullets], key)
+
+    xs = [bullet.pos.x + (bullet.moving.right - bullet.moving.left) * bullet.movespeed
+          for bullet in bullets]
+    _, idxs = pgfwb.collision.sweep_many(
+        [tuple(bullet.rect) for bullet in bullets],
+        [(int(x) - bullet.rect.x, 0) for x, bullet in zip(xs, bullets)],
+        [around + enemy_rects for around in rects],
+    )
+
+    for bullet, x, idx, around in zip(bullets, xs, idxs.tolist(), rects):
+        bullet.pos.x = x
+        bullet.rect.x = int(x)
+
+        # an enemy an earlier bullet took down this frame doesn't stop this one
+        enemy_idx = idx - len(around)
+        if idx >= 0 and (enemy_idx < 0 or enemies[enemy_idx].active):
+            bullet.hit(enemy_idx, enemies)
+
+        bullet.finish_update(around)
 
 # Rates are applied for behaviors. 
 SLOW_RATE = 120
 NORMAL_RATE = 60
 FAST_RATE = 30
 
+# Behaviors are called by a BehaviorScheduler at their transitions only.
+# They return the number of frames until their next transition, or None
+# when they never need to run again.
+
+# Behaviors draw from rng rather than the global random, so a run can be
+# reproduced by seeding it (see simulation and replay)
+rng = random.Random()
+
 def standing_behavior(frame_entity):
-    ...
+    return None
 
-def pacing_behavior(frame_entity, frame_rate, variance=5):
-    behaviors = [
-        frame_entity.stand,
-        frame_entity.move_left,
-        frame_entity.stand,
-        frame_entity.move_right
-    ]
+PACING_STEPS = ('stand', 'move_left', 'stand', 'move_right')
 
-    variance_frames = random.randint(-variance, variance)
+def pacing_behavior(frame_entity, frame_rate, variance=5):
+    step = PACING_STEPS[frame_entity.behavior_step % len(PACING_STEPS)]
+    getattr(frame_entity, step)()
+    frame_entity.behavior_step += 1
 
-    behavior = behaviors[frame_entity.frame // frame_rate % len(behaviors)]
-    behavior()
+    return frame_rate + rng.randint(-variance, variance)
 
 def pacing_behavior_slow(frame_entity):
-    pacing_behavior(frame_entity=frame_entity, frame_rate=SLOW_RATE)
+    return pacing_behavior(frame_entity=frame_entity, frame_rate=SLOW_RATE)
 
 def pacing_behavior_normal(frame_entity): 
-    pacing_behavior(frame_entity=frame_entity, frame_rate=NORMAL_RATE)
+    return pacing_behavior(frame_entity=frame_entity, frame_rate=NORMAL_RATE)
 
 def pacing_behavior_fast(frame_entity):
-    pacing_behavior(frame_entity=frame_entity, frame_rate=FAST_RATE)
+    return pacing_behavior(frame_entity=frame_entity, frame_rate=FAST_RATE)
+
+# Sensing behaviors look at the tilemap every LOOK_RATE frames
+LOOK_RATE = 5
+SIGHT_RANGE = TILESIZE * 8
+
+def unowned(frame_entity):
+    """
+    Behaviors that sense the tilemap stand while no PlatformerTileMap owns
+    the entity (see PlatformerTileMap.adopt for spawned or pooled enemies)
+    """
+    if frame_entity.tilemap is None:
+        frame_entity.stand()
+        return True
+
+    return False
+
+def ledge_pacing_behavior(frame_entity):
+    """Walks back and forth, turning around at walls and ledges"""
+    if unowned(frame_entity):
+        return LOOK_RATE
+
+    if not frame_entity.moving:
+        frame_entity.move_right()
+
+    tilemap = frame_entity.tilemap
+    rect = frame_entity.rect
+    direction = 1 if frame_entity.moving.right else -1
+    lookahead = frame_entity.movespeed * LOOK_RATE
+    front = rect.centerx + direction * rect.width // 2
+
+    wall = tilemap.raycast((front, rect.centery), (direction, 0), lookahead)
+    floor = tilemap.raycast((front + direction * lookahead, rect.bottom - 1), (0, 1), TILESIZE // 2)
+
+    if wall or not floor:
+        if direction > 0:
+            frame_entity.move_left()
+        else:
+            frame_entity.move_right()
+
+    return LOOK_RATE
+
+def chasing_behavior(frame_entity):
+    """Walks toward the player while it is in range and in sight, else stands"""
+    if unowned(frame_entity):
+        return LOOK_RATE
+
+    tilemap = frame_entity.tilemap
+    player = tilemap.player
+    start, goal = frame_entity.rect.center, player.rect.center
+    distance = pygame.Vector2(goal).distance_to(start)
+
+    if distance <= SIGHT_RANGE and tilemap.line_of_sight(start, goal):
+        if goal[0] < start[0]:
+            frame_entity.move_left()
+        else:
+            frame_entity.move_right()
+    else:
+        frame_entity.stand()
+
+    return LOOK_RATE
+
+# Patrols go between the spawn node and the node nearest this many tiles right of it
+PATROL_RANGE = 6
+
+def follow_path(frame_entity, steps):
+    """Heads for the second step of a navigation path, jumping on jump links"""
+    if not steps or len(steps) < 2:
+        frame_entity.stand()
+        return
+
+    (node, _), (next_node, kind) = steps[0], steps[1]
+    if next_node[0] < node[0]:
+        frame_entity.move_left()
+    elif next_node[0] > node[0]:
+        frame_entity.move_right()
+    else:
+        frame_entity.stand()
+
+    if kind == pgfwb.navigation.JUMP and frame_entity.air_frames == 0:
+        frame_entity.jump()
+
+def path_chasing_behavior(frame_entity):
+    """Follows the navigation path to the node the player last stood on"""
+    if unowned(frame_entity):
+        return LOOK_RATE
+
+    tilemap = frame_entity.tilemap
+    graph = tilemap.nav_graph(frame_entity)
+
+    if (goal := graph.node_at(tilemap.player.rect)) is not None:
+        frame_entity.goal = goal
+
+    if (start := graph.node_at(frame_entity.rect)) is not None:
+        follow_path(frame_entity, graph.path(start, frame_entity.goal))
+
+    return LOOK_RATE
+
+def patrolling_behavior(frame_entity):
+    """Walks, falls and jumps back and forth along a navigation path"""
+    if unowned(frame_entity):
+        return LOOK_RATE
+
+    graph = frame_entity.tilemap.nav_graph(frame_entity)
+    if (start := graph.node_at(frame_entity.rect)) is None:
+        return LOOK_RATE
+
+    if frame_entity.patrol is None:
+        target = graph.nearest_node((start[0] + PATROL_RANGE, start[1]))
+        frame_entity.patrol = [start, target]
+
+    if start == frame_entity.patrol[-1]:
+        frame_entity.patrol.reverse()
+
+    follow_path(frame_entity, graph.path(start, frame_entity.patrol[-1]))
+
+    return LOOK_RATE
 
 behavior_functions = [
     standing_behavior,
     pacing_behavior_slow,
     pacing_behavior_normal,
-    pacing_behavior_fast
+    pacing_behavior_fast,
+    ledge_pacing_behavior,
+    chasing_behavior,
+    path_chasing_behavior,
+    patrolling_behavior,
 ]
 
 behavior_function_map = {fn.__name__: fn for fn in behavior_functions}
 
+DORMANT_RATE = 15
+
+class BehaviorScheduler:
+    """
+    Timer wheel keyed on frame number. Entities sit in the bucket for the
+    frame of their next behavior transition, so a tick only touches the
+    entities that are due instead of polling every behavior every frame.
+    Inactive entities that come due are checked again every DORMANT_RATE
+    frames, so pooled or respawned enemies pick their behavior back up.
+    """
+    def __init__(self):
+        self.frame = 0
+        self.wheel = {}
+        self.due = {}
+
+    def schedule(self, entity, delay=1):
+        """Runs the entity's behavior delay frames from now (at least 1)"""
+        self.cancel(entity)
+        frame = self.frame + max(1, delay)
+        self.wheel.setdefault(frame, {})[entity] = None
+        self.due[entity] = frame
+
+    def cancel(self, entity):
+        if (frame := self.due.pop(entity, None)) is not None:
+            del self.wheel[frame][entity]
+
+    def clear(self):
+        self.wheel = {}
+        self.due = {}
+
+    def tick(self):
+        """Advance one frame and run the behaviors that are due"""
+        self.frame += 1
+
+        for entity in self.wheel.pop(self.frame, ()):
+            del self.due[entity]
+
+            if not entity.active:
+                self.schedule(entity, DORMANT_RATE)
+                continue
+
+            if (delay := entity.behavior(entity)) is not None:
+                self.schedule(entity, delay)
+
 class FrameEntity(PhysicsEntity):
     """
-    A physics entity that tracks its frames. Used for behavior
+    A physics entity that counts its updates in frame. Behaviors are
+    timed by BehaviorScheduler and don't read it; it is kept for game
+    code that paces itself on the entity's own frames.
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -305,14 +590,39 @@ class FrameEntity(PhysicsEntity):
         self.frame += 1
     
 class Enemy(FrameEntity):
+    """
+    Behaviors run on the owning PlatformerTileMap's scheduler; call its
+    update_behaviors once per frame. If a loop doesn't, update ticks the
+    scheduler when it hasn't advanced since the enemy's last update. An
+    enemy no tilemap owns ticks a scheduler of its own from update, and
+    its map sensing behaviors stand until PlatformerTileMap.adopt.
+    """
     def __init__(self, behavior_name, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.behavior_name = behavior_name
         self.behavior = behavior_function_map[behavior_name]
+        self.behavior_step = 0
+        self.tilemap = None
+        self.goal = None
+        self.patrol = None
+        self.scheduler = None
+        self.ticked = None
 
     def update(self, rects):
         super().update(rects)
-        self.behavior(self)
+
+        if self.tilemap is None:
+            if self.scheduler is None:
+                self.scheduler = BehaviorScheduler()
+                self.scheduler.schedule(self)
+
+            self.scheduler.tick()
+        else:
+            scheduler = self.tilemap.scheduler
+            if scheduler.frame == self.ticked:
+                scheduler.tick()
+
+            self.ticked = scheduler.frame
 
 class Lava(Enemy):
     def __init__(self, behavior_name='standing_behavior', *args, **kwargs):
@@ -330,6 +640,8 @@ class Lava(Enemy):
         ...
 
 class StaticEntity:
+    layer = pgfwb.render.ENTITY_LAYER
+
     def __init__(
         self, 
         pos=None, 
@@ -345,7 +657,10 @@ class StaticEntity:
         if pos is None:
             pos = pygame.Vector2()
 
-        self.surf = pygame.Surface((width, height))
+        self.surf = pgfwb.memory.track(
+            pgfwb.render.prepare(pygame.Surface((width, height))),
+            'entities',
+        )
 
         self.color = color
         if color: 
@@ -353,15 +668,20 @@ class StaticEntity:
 
         self.filepath = filepath
         if filepath:
-            self.surf = pygame.image.load(filepath).convert_alpha()
+            self.surf = pgfwb.memory.track(
+                pygame.image.load(filepath).convert_alpha(),
+                'entities',
+            )
         
         self.rect = pygame.Rect(*pos, width, height)
 
-    def render(self, target=pgfwb.ui.display, camera=None):
-        if camera:
-            target.blit(self.surf, camera.offset_rect(self.rect))
-        else:
-            target.blit(self.surf, self.rect)
+    def draw_items(self):
+        """(surf, world pos, layer) to draw, see PhysicsEntity.draw_items"""
+        yield self.surf, self.rect.topleft, self.layer
+
+    def render(self, target=pgfwb.ui.render_queue, camera=None):
+        for surf, pos, layer in self.draw_items():
+            pgfwb.render.draw(target, surf, camera.offset_pos(pos) if camera else pos, layer)
 
 class Door(StaticEntity):
     ...
@@ -387,16 +707,90 @@ entity_classes = [
 entity_class_map = {cls.__name__: cls for cls in entity_classes}
 
 class PlatformerTileMap(pgfwb.tile.TileMap):
-    def __init__(self, file=None):
-        self.tiles = {}
+    def __init__(self, file=None, journal=False):
+        super().__init__()
+        self.scheduler = BehaviorScheduler()
+        self.nav_graphs = {}
+        self._player = None
 
         if file:
-            self.load(file, [entity_class_map])
+            self.load(file, [entity_class_map], journal)
+
+    def load(self, file, class_maps=None, journal=False):
+        super().load(file, class_maps, journal)
+
+        self._player = None
+        self.nav_graphs = {}
+        self.scheduler.clear()
+        for enemy in self.enemies:
+            self.adopt(enemy)
+
+    def add(self, coord, tile_partial):
+        self.remove(coord)
+        super().add(coord, tile_partial)
+
+        if isinstance(tile := self.tiles[coord], Enemy):
+            self.adopt(tile)
+
+        self._player = None
+
+        if pgfwb.tile.collides(tile):
+            self.invalidate_nav_graphs(coord)
+
+    def remove(self, coord):
+        if isinstance(self.tiles.get(coord), Enemy):
+            self.scheduler.cancel(self.tiles[coord])
+
+        solid = pgfwb.tile.collides(self.tiles[coord]) if coord in self.tiles else False
+        super().remove(coord)
+        self._player = None
+
+        if solid:
+            self.invalidate_nav_graphs(coord)
+
+    def add_to_layer(self, name, coord, tile_partial):
+        super().add_to_layer(name, coord, tile_partial)
+
+        if name != pgfwb.tile.MAIN_LAYER and self.layers[name].solid:
+            self.invalidate_nav_graphs(coord)
+
+    def remove_from_layer(self, name, coord):
+        super().remove_from_layer(name, coord)
+
+        if name != pgfwb.tile.MAIN_LAYER and self.layers[name].solid:
+            self.invalidate_nav_graphs(coord)
+
+    def nav_graph(self, entity):
+        """The navigation graph for entity's movement, built once per movement profile"""
+        profile = (entity.movespeed, entity.jumpforce, entity.gravity, entity.maxfallspeed)
+        if (graph := self.nav_graphs.get(profile)) is None:
+            graph = self.nav_graphs[profile] = pgfwb.navigation.NavGraph(self, *profile)
+
+        return graph
+
+    def invalidate_nav_graphs(self, coord):
+        for graph in self.nav_graphs.values():
+            graph.invalidate(coord)
+
+    def adopt(self, enemy):
+        """
+        Owns an enemy and schedules its behavior. Enemies stored in the map
+        are adopted on load and add; call it for enemies that live outside
+        it (spawned, pooled) so their behaviors can sense the map.
+        """
+        enemy.tilemap = self
+        enemy.scheduler = None
+        self.scheduler.schedule(enemy)
+
+    def update_behaviors(self):
+        self.scheduler.tick()
 
     @property
     def player(self):
-        return [x for x in self.tiles.values()
-                if isinstance(x, Player)][0]
+        if self._player is None:
+            self._player = [x for x in self.tiles.values()
+                            if isinstance(x, Player)][0]
+        return self._player
 
     @property
     def enemies(self):
@@ -0,0 +1,96 @@
+"""
+The Pool module keeps prewarmed entities around so games can spawn and
+despawn them without allocating during the game loop.
+
+Design choices:
+    - pooled entities are deactivated with the same `active` flag the
+      platformer entities already use, so an entity that turns itself off
+      (e.g. a Bullet that hits a wall) is reclaimed on the next iteration
+    - the free list is a plain list used as a stack for O(1) acquire/release
+"""
+
+class EntityPool:
+    """
+    Holds `size` instances of entity_class built with kwargs.
+
+    Usage:
+        bullets = EntityPool(Bullet, 16, folder='bullet', width=6, height=6)
+        bullet = bullets.acquire(pos=player.pos.copy(), flip=player.flip)
+
+        for bullet in bullets:
+            bullet.update(rects, enemies)
+    """
+    def __init__(self, entity_class, size, grow=True, **kwargs):
+        self.entity_class = entity_class
+        self.kwargs = kwargs
+        self.grow = grow
+        self.entities = []
+        self.free = []
+        self.active = {}
+        self.high_water_mark = 0
+
+        for _ in range(size):
+            self.free.append(self.create())
+
+    def create(self):
+        entity = self.entity_class(**self.kwargs)
+        entity.active = False
+        self.entities.append(entity)
+        return entity
+
+    def acquire(self, **attrs):
+        """
+        Pops a free entity, sets attrs on it and marks it active.
+        Returns None when the pool is exhausted and grow is False.
+        """
+        if self.free:
+            entity = self.free.pop()
+        elif self.grow:
+            entity = self.create()
+        else:
+            return None
+
+        for name, value in attrs.items():
+            setattr(entity, name, value)
+
+        entity.active = True
+        self.active[entity] = None
+        self.high_water_mark = max(self.high_water_mark, len(self.active))
+        return entity
+
+    def release(self, entity):
+        if entity in self.active:
+            del self.active[entity]
+            entity.active = False
+            self.free.append(entity)
+
+    def release_all(self):
+        for entity in list(self.active):
+            self.release(entity)
+
+    def __iter__(self):
+        """
+        Yields active entities only. Entities that deactivated themselves
+        since the last pass are returned to the free list here.
+        """
+        for entity in list(self.active):
+            if entity.active:
+                yield entity
+            else:
+                self.release(entity)
+
+    def __len__(self):
+        return len(self.active)
+
+    @property
+    def size(self):
+        return len(self.entities)
+
+    @property
+    def stats(self):
+        return {
+            'size': self.size,
+            'active': len(self.active),
+            'free': len(self.free),
+            'high_water_mark': self.high_water_mark,
+        }
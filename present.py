@@ -0,0 +1,95 @@
+"""
+The Present module gets the finished display surface onto the window.
+
+Backends:
+    - 'surface' scales the display into the display module's window with
+      pygame.transform.scale on the CPU and flips it (the original path)
+    - 'renderer' uploads the display to a streaming texture of a
+      pygame._sdl2.video Renderer, which does the scaling, letterboxed to
+      the largest integer scale that fits the window. It runs on whatever
+      renderer SDL picks, including the software one on a box without a GPU
+
+The backend comes from settings.PRESENT_BACKEND, 'surface' when unset.
+When the renderer can't be created the surface backend is used instead.
+"""
+import logging
+
+import pygame
+import settings
+
+logger = logging.getLogger(__name__)
+
+class SurfacePresenter:
+    """
+    screen is the window surface. dest is the rect the display covers in
+    the window and window_size its size, as on RendererPresenter.
+    """
+    def __init__(self, size, scale):
+        self.size = size
+        self.screen = pygame.display.set_mode((size[0] * scale, size[1] * scale))
+
+    @property
+    def window_size(self):
+        return self.screen.get_size()
+
+    def dest(self):
+        return self.screen.get_rect()
+
+    def present(self, display):
+        pygame.transform.scale(display, self.screen.get_size(), self.screen)
+        pygame.display.flip()
+
+class RendererPresenter:
+    """
+    The window has no surface to draw on, so screen is None; dest and
+    window_size describe the visible output instead.
+    """
+    def __init__(self, size, scale, title='pygame window'):
+        from pygame._sdl2 import video
+
+        self.size = size
+        self.window = video.Window(title, size=(size[0] * scale, size[1] * scale), resizable=True)
+        self.renderer = video.Renderer(self.window, vsync=False)
+        self.renderer.draw_color = (0, 0, 0, 255)
+        self.texture = video.Texture(self.renderer, size, streaming=True)
+
+        # Surface.convert needs a display mode, so the display module gets
+        # a hidden window of its own to take the pixel format from
+        self.format_window = pygame.display.set_mode((1, 1), pygame.HIDDEN)
+        self.screen = None
+
+    @property
+    def window_size(self):
+        return self.window.size
+
+    def dest(self):
+        """Display rect centered in the window at the largest integer scale that fits"""
+        width, height = self.window.size
+        scale = max(1, min(width // self.size[0], height // self.size[1]))
+        rect = pygame.Rect(0, 0, self.size[0] * scale, self.size[1] * scale)
+        rect.center = (width // 2, height // 2)
+
+        return rect
+
+    def present(self, display):
+        self.texture.update(display)
+        self.renderer.clear()
+        self.texture.draw(dstrect=self.dest())
+        self.renderer.present()
+
+backends = {
+    'surface': SurfacePresenter,
+    'renderer': RendererPresenter,
+}
+
+def create(size, scale, backend=None):
+    """Presenter for backend (default settings.PRESENT_BACKEND), falling back to SurfacePresenter"""
+    backend = backend or getattr(settings, 'PRESENT_BACKEND', 'surface')
+
+    if backend != 'surface':
+        try:
+            return backends[backend](size, scale)
+        except (ImportError, RuntimeError) as error:
+            logger.warning("%s present backend unavailable, using surface: %s", backend, error)
+
+    return SurfacePresenter(size, scale)
@@ -0,0 +1,162 @@
+"""
+The Render module batches blits so a frame reaches its target with a single
+Surface.blits call instead of one Python-to-C round trip per object.
+
+Design choices:
+    - render methods take a target that is either a Surface or a
+      RenderQueue, and go through draw so both keep working
+    - layers are drawn in ascending order; submissions within a layer
+      keep their order
+    - surfaces are put in the display's pixel format when they are created
+      (prepare) so blits never go through SDL's per-pixel conversion;
+      set debug_formats to log blits that still do
+"""
+import collections
+import itertools
+import logging
+import weakref
+
+import pygame
+
+from pgfwb import memory
+
+logger = logging.getLogger(__name__)
+
+debug_formats = False
+format_mismatches = collections.Counter()
+
+TILE_LAYER = 0
+ENTITY_LAYER = 1
+UI_LAYER = 2
+
+class RenderQueue:
+    """
+    Collects (surf, dest) pairs for a frame. ui.screen_refresh flushes
+    ui.render_queue onto the display before scaling it to the screen.
+
+    render() methods default to ui.render_queue, so they draw when the
+    frame ends, over anything blitted straight onto ui.display meanwhile
+    (a HUD). Submit such draws on UI_LAYER, or call ui.flush first.
+    """
+    def __init__(self):
+        self.layers = {}
+        self.fills = {}
+
+    def submit(self, surf, dest, layer=ENTITY_LAYER):
+        if (items := self.layers.get(layer)) is None:
+            items = self.layers[layer] = []
+
+        items.append((surf, dest))
+
+    def extend(self, pairs, layer=ENTITY_LAYER):
+        if (items := self.layers.get(layer)) is None:
+            items = self.layers[layer] = []
+
+        items.extend(pairs)
+
+    def fill(self, color, rect, layer=ENTITY_LAYER):
+        """Fills of a layer are drawn before its blits, clipped to the target"""
+        if (items := self.fills.get(layer)) is None:
+            items = self.fills[layer] = []
+
+        items.append((color, rect))
+
+    def blit(self, surf, dest):
+        """Lets a RenderQueue stand in for a Surface target"""
+        self.submit(surf, dest)
+
+    def flush(self, target):
+        """
+        One blits call for the whole frame, split only where a layer above
+        the lowest one has fills that must land between blits
+        """
+        if debug_formats:
+            for items in self.layers.values():
+                for surf, _ in items:
+                    check_format(surf, target)
+
+        pending = []
+        for layer in sorted(self.layers.keys() | self.fills.keys()):
+            if fills := self.fills.get(layer):
+                if pending:
+                    target.blits(itertools.chain.from_iterable(pending), doreturn=False)
+                    pending = []
+
+                clip = target.get_clip()
+                for color, rect in fills:
+                    target.fill(color, clip.clip(rect))
+                fills.clear()
+
+            if items := self.layers.get(layer):
+                pending.append(items)
+
+        if pending:
+            target.blits(itertools.chain.from_iterable(pending), doreturn=False)
+
+        for items in self.layers.values():
+            items.clear()
+
+def draw(target, surf, dest, layer=ENTITY_LAYER):
+    """Submit to a RenderQueue, or blit straight away onto a Surface"""
+    if isinstance(target, RenderQueue):
+        target.submit(surf, dest, layer)
+    else:
+        if debug_formats:
+            check_format(surf, target)
+
+        target.blit(surf, dest)
+
+def fill(target, color, rect, layer=ENTITY_LAYER):
+    """Queue a fill on a RenderQueue, or fill straight away on a Surface"""
+    if isinstance(target, RenderQueue):
+        target.fill(color, rect, layer)
+    else:
+        # Surface.fill keeps the full width of a rect hanging off the left edge
+        target.fill(color, target.get_clip().clip(rect))
+
+def prepare(surf, alpha=False):
+    """
+    Converts surf to the display's pixel format. Sprites with per-pixel
+    alpha use convert_alpha; colorkeyed surfs (e.g. font renders) keep
+    their colorkey with RLE acceleration. Without a display mode there is
+    no format to convert to, so surf is returned as is.
+    """
+    if pygame.display.get_surface() is None:
+        return surf
+
+    if alpha:
+        return surf.convert_alpha()
+
+    colorkey = surf.get_colorkey()
+    surf = surf.convert()
+    if colorkey:
+        surf.set_colorkey(colorkey, pygame.RLEACCEL)
+
+    return surf
+
+def check_format(surf, target):
+    """Counts, and logs the first time, a blit whose source format does not match target"""
+    source_format = (surf.get_bitsize(), surf.get_masks()[:3])
+    if source_format == (target.get_bitsize(), target.get_masks()[:3]):
+        return
+
+    key = (surf.get_size(), *source_format)
+    if not format_mismatches[key]:
+        logger.warning("slow blit: %s surf is %s bit %s, target is %s bit %s",
+                       surf.get_size(), *source_format,
+                       target.get_bitsize(), target.get_masks()[:3])
+
+    format_mismatches[key] += 1
+
+flipped_surfs = weakref.WeakKeyDictionary()
+
+def flipped(surf, category='animations'):
+    """
+    Horizontally flipped copy of surf, tracked under category. The copy is
+    cached for as long as surf is alive, so it is freed with its frame.
+    """
+    if (surf_flipped := flipped_surfs.get(surf)) is None:
+        surf_flipped = memory.track(pygame.transform.flip(surf, True, False), category)
+        flipped_surfs[surf] = surf_flipped
+
+    return surf_flipped
@@ -0,0 +1,149 @@
+"""
+The Replay module records the input a level consumed and plays it back
+headlessly, unthrottled, as a repeatable load test.
+
+A recording is a simulation scenario (map, frames, seed, inputs), so it
+also runs under pgfwb.simulation. Recording seeds platformer.rng, which
+the behaviors draw from, so a replay takes the same decisions.
+
+Usage (record, right after loading the level in the game):
+    import pgfwb.replay
+
+    tilemap = PlatformerTileMap('levels/level1.json')
+    recorder = pgfwb.replay.Recorder(tilemap, 'levels/level1.json')
+
+    while playing:
+        for event in pgfwb.controls.get_events():
+            ...
+
+        # update and render the level
+        ...
+        recorder.next_frame()
+
+    recorder.save('recordings/level1.json')
+
+The level loop calls next_frame once per frame, after its events and
+updates, so the frames line up with the steps of simulation.simulate.
+
+Usage (replay, from the game folder holding settings.py):
+    SDL_VIDEODRIVER=dummy python -m pgfwb.replay recordings/level1.json --render --repeat 5
+"""
+import argparse
+import json
+import random
+import statistics
+
+import pygame
+
+import pgfwb
+from pgfwb.platformer import PlatformerTileMap
+from pgfwb.simulation import simulate
+
+KEY_NAMES = {getattr(pygame, name): name for name in dir(pygame) if name.startswith('K_')}
+
+EVENT_NAMES = {
+    pygame.KEYDOWN: 'KEYDOWN',
+    pygame.KEYUP: 'KEYUP',
+}
+
+class Recorder:
+    def __init__(self, tilemap, map_file, seed=None):
+        self.tilemap = tilemap
+        self.map_file = map_file
+        self.seed = random.randrange(2 ** 32) if seed is None else seed
+        self.frame = 0
+        self.inputs = []
+
+        pgfwb.platformer.rng.seed(self.seed)
+        pgfwb.controls.recorder = self
+
+    def next_frame(self):
+        """
+        Ends a level frame. Events fetched during a ui loop land on the
+        frame the level resumes with, which is where their effect on the
+        player shows up.
+        """
+        self.frame += 1
+
+    def record(self, events):
+        for event in events:
+            if event.type in EVENT_NAMES and event.key in KEY_NAMES:
+                self.inputs.append([self.frame, EVENT_NAMES[event.type], KEY_NAMES[event.key]])
+
+    def stop(self):
+        if pgfwb.controls.recorder is self:
+            pgfwb.controls.recorder = None
+
+    def save(self, file):
+        """Stops recording and writes the scenario to file. Returns it."""
+        self.stop()
+        scenario = {
+            'map': self.map_file,
+            'frames': self.frame,
+            'seed': self.seed,
+            'inputs': self.inputs,
+        }
+
+        with open(file, 'w') as fp:
+            json.dump(scenario, fp)
+
+        return scenario
+
+def distribution(frame_times):
+    """Frame time summary in milliseconds"""
+    ms = sorted(seconds * 1000 for seconds in frame_times)
+    if not ms:
+        return {}
+
+    def percentile(pct):
+        return ms[min(len(ms) - 1, int(pct / 100 * len(ms)))]
+
+    return {
+        'mean': statistics.fmean(ms),
+        'p50': percentile(50),
+        'p90': percentile(90),
+        'p99': percentile(99),
+        'max': ms[-1],
+    }
+
+def replay(file, render=False):
+    with open(file) as fp:
+        scenario = json.load(fp)
+
+    pgfwb.platformer.rng.seed(scenario['seed'])
+    tilemap = PlatformerTileMap(scenario['map'])
+    frame_times = []
+    frames, result = simulate(tilemap, scenario['frames'], scenario['inputs'], frame_times, render)
+
+    return {
+        'frames': frames,
+        'outcome': result,
+        'player_pos': tuple(tilemap.player.pos),
+        'frame_times': distribution(frame_times),
+        'seconds': sum(frame_times),
+    }
+
+def load_test(file, repeat=1, render=False):
+    """Replays file repeat times. deterministic is False if any run ended differently."""
+    runs = [replay(file, render) for _ in range(repeat)]
+    ends = {(run['frames'], run['outcome'], run['player_pos']) for run in runs}
+
+    return {
+        'recording': file,
+        'runs': runs,
+        'deterministic': len(ends) == 1,
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('recording')
+    parser.add_argument('--repeat', type=int, default=1)
+    parser.add_argument('--render', action='store_true')
+    args = parser.parse_args()
+
+    report = load_test(args.recording, args.repeat, args.render)
+
+    for run in report['runs']:
+        times = ' '.join(f"{name} {ms:.2f}" for name, ms in run['frame_times'].items())
+        print(f"{run['frames']} frames, {run['outcome']}: {times} ms")
+    print(f"deterministic: {report['deterministic']}")
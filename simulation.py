@@ -0,0 +1,158 @@
+"""
+The Simulation module runs PlatformerTileMap levels headlessly, with no
+rendering and no frame pacing, and fans scenarios out over a process pool.
+
+A scenario is a JSON file:
+
+    {
+        "map": "levels/level1.json",
+        "frames": 3600,
+        "seed": 0,
+        "inputs": [[frame, "KEYDOWN", "K_RIGHT"], [frame, "KEYUP", "K_RIGHT"]]
+    }
+
+Usage (from the game folder holding settings.py):
+
+    python -m pgfwb.simulation scenarios/*.json --processes 8 --out report.json
+"""
+import argparse
+import collections
+import json
+import multiprocessing
+import os
+import time
+
+import pygame
+
+import pgfwb
+from pgfwb.platformer import Door, Enemy, PlatformerTileMap, update_bullets
+from pgfwb.tile import collides
+
+def input_events(inputs):
+    """Scenario inputs grouped into pygame events by frame"""
+    events = collections.defaultdict(list)
+    for frame, event_type, key in inputs:
+        events[frame].append(pygame.event.Event(
+            getattr(pygame, event_type),
+            {'key': getattr(pygame, key)},
+        ))
+
+    return events
+
+def outcome(tilemap, player):
+    """'door' when the player reaches a door, 'hit' when it touches an active enemy, else None"""
+    for tile in tilemap.tiles.values():
+        if isinstance(tile, Door) and player.rect.colliderect(tile.rect):
+            return 'door'
+        if isinstance(tile, Enemy) and tile.active and player.rect.colliderect(tile.rect):
+            return 'hit'
+
+    return None
+
+def simulate(tilemap, frames, inputs=(), frame_times=None, render=False):
+    """
+    Steps the level frames times the way a game loop would, minus
+    clock.tick and, unless render is set, rendering. Appends each frame's
+    seconds to frame_times when given. Returns the frames simulated and
+    the outcome.
+    """
+    player = tilemap.player
+    enemies = tilemap.enemies
+    events = input_events(inputs)
+    camera = pgfwb.tile.Camera(player) if render else None
+
+    for frame in range(frames):
+        start = time.perf_counter()
+
+        for event in events.get(frame, ()):
+            player.event_controls(event)
+
+        tilemap.update_behaviors()
+
+        # one batched tile query for the player and every active enemy
+        entities = [player, *(enemy for enemy in enemies if enemy.active)]
+        for entity, rects in zip(entities, tilemap.rects_in_many(
+                [entity.reach for entity in entities], key=collides)):
+            entity.update(rects)
+
+        update_bullets(player.bullets, tilemap, enemies)
+
+        if camera:
+            camera.update()
+            pgfwb.ui.display.fill('black')
+            tilemap.render(pgfwb.ui.render_queue, camera)
+            pgfwb.ui.render_queue.flush(pgfwb.ui.display)
+
+        pgfwb.animation.timeline.advance()
+
+        if frame_times is not None:
+            frame_times.append(time.perf_counter() - start)
+
+        if result := outcome(tilemap, player):
+            return frame + 1, result
+
+    return frames, 'timeout'
+
+def run_scenario(file):
+    with open(file) as fp:
+        scenario = json.load(fp)
+
+    pgfwb.platformer.rng.seed(scenario.get('seed', 0))
+    tilemap = PlatformerTileMap(scenario['map'])
+
+    start = time.perf_counter()
+    frames, result = simulate(tilemap, scenario['frames'], scenario.get('inputs', ()))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'scenario': file,
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed else 0,
+        'outcome': result,
+        'enemies_left': sum(enemy.active for enemy in tilemap.enemies),
+    }
+
+def run(files, processes=None):
+    """
+    Runs every scenario file across a spawn process pool and returns one
+    report. Workers import pgfwb fresh, so SDL is pointed at its dummy
+    drivers first to keep them off the display.
+    """
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # SDL turns SIGTERM into a QUIT event, which would leave Pool.terminate hanging
+    os.environ.setdefault('SDL_NO_SIGNAL_HANDLERS', '1')
+
+    start = time.perf_counter()
+    with multiprocessing.get_context('spawn').Pool(processes) as pool:
+        runs = pool.map(run_scenario, files)
+        pool.close()
+        pool.join()
+    elapsed = time.perf_counter() - start
+
+    frames = sum(result['frames'] for result in runs)
+
+    return {
+        'runs': runs,
+        'frames': frames,
+        'seconds': elapsed,
+        'fps': frames / elapsed if elapsed else 0,
+        'outcomes': collections.Counter(result['outcome'] for result in runs),
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('scenarios', nargs='+')
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--out', default=None)
+    args = parser.parse_args()
+
+    report = run(args.scenarios, args.processes)
+
+    if args.out:
+        with open(args.out, 'w') as fp:
+            json.dump(report, fp, indent=2)
+
+    print(f"{len(report['runs'])} runs, {report['frames']} frames, "
+          f"{report['fps']:.0f} frames/s, {dict(report['outcomes'])}")
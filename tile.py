@@ -12,13 +12,28 @@ import pgfwb
 import pygame
 import settings
 import json
+import functools
 import itertools
+import math
+import os
+import threading
+import weakref
+
+import numpy as np
 
 def pos_to_coord(pos):
-    return tuple(map(lambda x: int(x // settings.TILESIZE), pos))
+    return (int(pos[0] // settings.TILESIZE), int(pos[1] // settings.TILESIZE))
 
 def coord_to_pos(coord):
-    return tuple(map(lambda x: int(x * settings.TILESIZE), coord))
+    return (int(coord[0] * settings.TILESIZE), int(coord[1] * settings.TILESIZE))
+
+def poses_to_coords(poses):
+    """pos_to_coord for an (N, 2) array of poses, returns an (N, 2) int array"""
+    return np.floor_divide(np.asarray(poses), settings.TILESIZE).astype(int)
+
+def coords_to_poses(coords):
+    """coord_to_pos for an (N, 2) array of coords, returns an (N, 2) int array"""
+    return (np.asarray(coords) * settings.TILESIZE).astype(int)
 
 adjacent_coords = tuple(itertools.product([-1, 0, 1], [-1, 0, 1]))
 adjacent_poses = tuple(map(coord_to_pos, adjacent_coords))
@@ -27,23 +42,31 @@ class Tile:
     """
     Models a Tile object. Children implement the graphics.
     """
+    layer = pgfwb.render.TILE_LAYER
+
     def __init__(self, coord=(0, 0), detect_collision=True):
-        self.surf = pygame.Surface((settings.TILESIZE, settings.TILESIZE))
-        self.rect = self.surf.get_rect()
         self.coord = coord
         self.pos = coord_to_pos(coord)
-        self.rect.x, self.rect.y = list(map(int, self.pos))
+        self.rect = pygame.Rect(self.pos, (settings.TILESIZE, settings.TILESIZE))
         self.detect_collision = detect_collision
 
+    @functools.cached_property
+    def surf(self):
+        """Children either assign surf in __init__ or override this"""
+        return pgfwb.memory.track(
+            pgfwb.render.prepare(pygame.Surface((settings.TILESIZE, settings.TILESIZE))),
+            'tiles',
+        )
+
     @property
     def blit_args(self):
         return (self.surf, self.rect)
 
-    def render(self, target=pgfwb.ui.display, camera=None):
+    def render(self, target=pgfwb.ui.render_queue, camera=None):
         if camera:
-            target.blit(self.surf, camera.offset_rect(self.rect))
+            pgfwb.render.draw(target, self.surf, camera.offset_pos(self.rect.topleft), self.layer)
         else:
-            target.blit(*self.blit_args)
+            pgfwb.render.draw(target, *self.blit_args, self.layer)
 
     def recalc_rect(self):
         """
@@ -57,10 +80,26 @@ class Tile:
         )
 
 class ColorTile(Tile):
+    """
+    Solid color tile. TileMap draws these as merged runs with
+    target.fill, so the surf is only allocated if something asks for it.
+    """
     def __init__(self, color='white', **kwargs):
         super().__init__(**kwargs)
         self.color = color
-        self.surf.fill(color)
+
+    @functools.cached_property
+    def surf(self):
+        surf = super().surf
+        surf.fill(self.color)
+        return surf
+
+    def render(self, target=pgfwb.ui.render_queue, camera=None):
+        rect = self.rect
+        if camera:
+            rect = pygame.Rect(camera.offset_pos(rect.topleft), rect.size)
+
+        pgfwb.render.fill(target, self.color, rect, self.layer)
 
 class GraphicTile(Tile):
     def __init__(self, filepath, index=0, **kwargs):
@@ -68,7 +107,10 @@ class GraphicTile(Tile):
         self.filepath = filepath
         self.index = index
         spritesheet = pygame.image.load(filepath).convert_alpha()
-        self.surf = pygame.Surface((settings.TILESIZE, settings.TILESIZE)).convert_alpha()
+        self.surf = pgfwb.memory.track(
+            pygame.Surface((settings.TILESIZE, settings.TILESIZE)).convert_alpha(),
+            'tiles',
+        )
         self.surf.fill(pygame.Color(0, 0, 0, 0))
         self.surf.blit(spritesheet, (-index * settings.TILESIZE, 0))
 
@@ -79,18 +121,359 @@ tile_classes = (
 
 tile_class_map = {cls.__name__: cls for cls in tile_classes}
 
+# Side in tiles of the chunks ColorTile runs are built and invalidated in
+COLOR_RUN_CHUNK = 16
+
+# Side in tiles of the chunks static layers are baked in
+LAYER_CHUNK = 16
+
+# Name of the layer TileMap.tiles belongs to
+MAIN_LAYER = 'main'
+
+keep_fields = (
+    'detect_collision',
+    'destination_str',
+    'behavior_name',
+    'movespeed',
+    'jumpforce',
+    'width',
+    'height',
+    'gravity',
+    'filepath',
+    'folder',
+    'index',
+    'color',
+)
+
+def tile_data(tile):
+    """The JSON kwargs for a tile, as stored by TileMap.save"""
+    kwargs = {k: v for k, v in tile.__dict__.items()
+              if k in keep_fields}
+
+    kwargs['tile_class'] = tile.__class__.__name__
+
+    return kwargs
+
+def write_atomic(file, data):
+    tmp_file = f"{file}.tmp"
+    with open(tmp_file, 'w') as fp:
+        json.dump(data, fp)
+        fp.flush()
+        os.fsync(fp.fileno())
+
+    os.replace(tmp_file, file)
+
+class Journal:
+    """
+    Append-only edit log for a TileMap file, stored next to it as
+    <file>.journal with one JSON record per line:
+
+        ["add", "x,y", {kwargs + tile_class}]
+        ["remove", "x,y"]
+
+    with the layer name appended for edits outside the main layer, and
+    ["layer", name, {parallax, static, solid, wrap, front}] for add_layer.
+
+    Once the log passes threshold records it is rotated to
+    <file>.journal.compacting and a background thread writes a fresh
+    snapshot of the map over file (atomic rename) before deleting it.
+    Records only set or delete a key, so replaying a log over a snapshot
+    that already contains it gives the same map. Loading replays the
+    snapshot, then the compacting log, then the live log.
+    """
+    def __init__(self, file, tilemap, threshold=500):
+        self.file = file
+        self.path = f"{file}.journal"
+        self.compacting_path = f"{file}.journal.compacting"
+        self.tilemap = tilemap
+        self.threshold = threshold
+        self.thread = None
+
+        recovering = os.path.exists(self.compacting_path)
+        self.count = self.replay(self.compacting_path) + self.replay(self.path)
+
+        if recovering:
+            # a compaction was interrupted, finish it before taking new edits
+            self.rewrite()
+        else:
+            self.fp = open(self.path, 'a')
+
+    def replay(self, path):
+        """
+        Apply the records of path to the map. A torn final record from a
+        crash mid-append is cut off the file, so later appends start on a
+        fresh line instead of extending it.
+        """
+        if not os.path.exists(path):
+            return 0
+
+        count = good = 0
+        layers = self.tilemap.layers
+        with open(path, 'rb') as fp:
+            for line in fp:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    op, key, *data = json.loads(line)
+                except ValueError:
+                    break
+
+                if op == 'layer':
+                    props = {**data[0]}
+                    front = props.pop('front')
+                    self.tilemap.add_layer(TileLayer(key, **props), front)
+                    layers = self.tilemap.layers
+                elif op == 'add':
+                    kwargs, *layer = data
+                    tiles = layers[layer[0]].tiles if layer else self.tilemap.tiles
+                    tiles[self.tilemap.key_to_coord(key)] = self.tilemap.build_tile(key, kwargs)
+                else:
+                    tiles = layers[data[0]].tiles if data else self.tilemap.tiles
+                    tiles.pop(self.tilemap.key_to_coord(key), None)
+
+                count += 1
+                good += len(line)
+
+        if good < os.path.getsize(path):
+            os.truncate(path, good)
+
+        return count
+
+    def append(self, record):
+        self.fp.write(json.dumps(record) + "\n")
+        self.fp.flush()
+        self.count += 1
+
+        if self.count >= self.threshold:
+            self.compact()
+
+    def compact(self):
+        """Rotate the log and snapshot the map in a background thread"""
+        if self.thread and self.thread.is_alive():
+            return
+
+        self.fp.close()
+        if os.path.exists(self.compacting_path):
+            # an earlier snapshot never landed, rotating now would overwrite
+            # its log; the map holds both logs, so snapshot it here instead
+            self.rewrite()
+            return
+
+        os.replace(self.path, self.compacting_path)
+        self.fp = open(self.path, 'a')
+        self.count = 0
+
+        snapshot = {name: dict(layer.tiles) for name, layer in self.tilemap.layers.items()}
+        self.thread = threading.Thread(target=self.write_snapshot, args=(snapshot,), daemon=True)
+        self.thread.start()
+
+    def write_snapshot(self, snapshot):
+        write_atomic(self.file, self.tilemap.serialize(snapshot))
+        os.remove(self.compacting_path)
+
+    def rewrite(self):
+        """Snapshot the whole map in the foreground and start an empty log"""
+        write_atomic(self.file, self.tilemap.serialize())
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+        self.fp = open(self.path, 'w')
+        self.count = 0
+
+    def reset(self):
+        """
+        Called after a full save of file, which makes both logs redundant.
+        A compacting log left by a writer thread that died would otherwise
+        be replayed over the newer snapshot on the next load.
+        """
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+        self.fp.close()
+        self.fp = open(self.path, 'w')
+        self.count = 0
+
+    def close(self):
+        if self.thread:
+            self.thread.join()
+
+        self.fp.close()
+
+def collides(tile):
+    """Default raycast key: plain tiles that detect collision (not entities)"""
+    return isinstance(tile, Tile) and tile.detect_collision
+
+def ray_axis(origin, direction, coord):
+    """Step, first boundary distance and per cell distance along one axis"""
+    if direction > 0:
+        return 1, ((coord + 1) * settings.TILESIZE - origin) / direction, settings.TILESIZE / direction
+    if direction < 0:
+        return -1, (coord * settings.TILESIZE - origin) / direction, settings.TILESIZE / -direction
+    return 0, math.inf, math.inf
+
+class TileLayer:
+    """
+    A named set of tiles drawn at parallax times the camera scroll (0 stays
+    put, 1 moves with the main layer).
+
+    Static layers are baked into LAYER_CHUNK sized surfaces the first time
+    a chunk is on screen, so a frame costs a blit per visible chunk
+    instead of one per tile; the bakes are evicted coldest first when the
+    memory ledger is over budget. Dynamic layers blit their tiles one by
+    one. wrap repeats the layer horizontally, for backgrounds. Only solid
+    layers take part in collision. Layers other than the main one hold
+    plain tiles, not entities.
+    """
+    def __init__(self, name, tiles=None, parallax=1.0, static=False, solid=False, wrap=False):
+        self.name = name
+        self.tiles = {} if tiles is None else tiles
+        self.parallax = parallax
+        self.static = static
+        self.solid = solid
+        self.wrap = wrap
+        self.bakes = {}
+        self.last_tick = {}
+        self._chunks = None
+
+    def data(self, tiles, coord_to_key):
+        """The layer's JSON data with tiles (its own or a snapshot of them)"""
+        return {
+            'name': self.name,
+            'parallax': self.parallax,
+            'static': self.static,
+            'solid': self.solid,
+            'wrap': self.wrap,
+            'tiles': {coord_to_key(coord): tile_data(tile) for coord, tile in tiles.items()},
+        }
+
+    def add(self, coord, tile_partial):
+        self.tiles[coord] = tile_partial(coord=coord)
+        self.invalidate(coord)
+
+    def remove(self, coord):
+        if self.tiles.pop(coord, None) is not None:
+            self.invalidate(coord)
+
+    def invalidate(self, coord):
+        chunk = self.chunk_of(coord)
+        self.bakes.pop(chunk, None)
+        self.last_tick.pop(chunk, None)
+        self._chunks = None
+
+    def chunk_of(self, coord):
+        return (coord[0] // LAYER_CHUNK, coord[1] // LAYER_CHUNK)
+
+    @property
+    def chunks(self):
+        """Tiles by chunk, plus the layer's (left, right) pixel span for wrapping"""
+        if self._chunks is None:
+            chunks = {}
+            for coord, tile in self.tiles.items():
+                if isinstance(tile, Tile):
+                    chunks.setdefault(self.chunk_of(coord), []).append(tile)
+
+            xs = [coord[0] for coord in self.tiles]
+            span = (min(xs) * settings.TILESIZE, (max(xs) + 1) * settings.TILESIZE) if xs else (0, 0)
+            self._chunks = (chunks, span)
+
+        return self._chunks
+
+    def bake(self, chunk):
+        self.last_tick[chunk] = pgfwb.animation.timeline.tick
+        if (surf := self.bakes.get(chunk)) is None:
+            side = LAYER_CHUNK * settings.TILESIZE
+            surf = pgfwb.render.prepare(pygame.Surface((side, side), pygame.SRCALPHA), alpha=True)
+            surf.fill((0, 0, 0, 0))
+            left, top = chunk[0] * side, chunk[1] * side
+            surf.blits([(tile.surf, (tile.rect.x - left, tile.rect.y - top))
+                        for tile in self.chunks[0][chunk]], doreturn=False)
+
+            baked_layers.add(self)
+            surf = self.bakes[chunk] = pgfwb.memory.track(surf, 'tiles')
+
+        return surf
+
+    def evict(self, chunk):
+        del self.bakes[chunk]
+        del self.last_tick[chunk]
+
+    def render(self, target=pgfwb.ui.render_queue, camera=None, layer=Tile.layer):
+        scroll = (0, 0)
+        if camera:
+            scroll = (int(camera.render_scroll.x * self.parallax), int(camera.render_scroll.y * self.parallax))
+
+        width, height = pgfwb.ui.display.get_size()
+        chunks, (left, right) = self.chunks
+
+        shifts = [0]
+        if self.wrap and right > left:
+            period = right - left
+            first = (scroll[0] - left) // period
+            last = (scroll[0] + width - 1 - left) // period
+            shifts = [idx * period for idx in range(first, last + 1)]
+
+        for shift in shifts:
+            view = pygame.Rect(scroll[0] - shift, scroll[1], width, height)
+
+            if not self.static:
+                for chunk_tiles in chunks.values():
+                    for tile in chunk_tiles:
+                        if tile.rect.colliderect(view):
+                            pgfwb.render.draw(target, tile.surf, (tile.rect.x - view.x, tile.rect.y - view.y), layer)
+                continue
+
+            side = LAYER_CHUNK * settings.TILESIZE
+            for chunk in itertools.product(
+                range(view.left // side, (view.right - 1) // side + 1),
+                range(view.top // side, (view.bottom - 1) // side + 1),
+            ):
+                if chunk in chunks:
+                    pgfwb.render.draw(target, self.bake(chunk), (chunk[0] * side - view.x, chunk[1] * side - view.y), layer)
+
+baked_layers = weakref.WeakSet()
+
+def evict_coldest_bake():
+    """Evicts the static layer chunk drawn longest ago, skipping chunks drawn this tick"""
+    tick = pgfwb.animation.timeline.tick
+    cold = [(last_tick, layer, chunk)
+            for layer in baked_layers
+            for chunk, last_tick in layer.last_tick.items()
+            if last_tick < tick and chunk in layer.bakes]
+
+    if not cold:
+        return False
+
+    _, layer, chunk = min(cold, key=lambda item: item[0])
+    layer.evict(chunk)
+    return True
+
+pgfwb.memory.ledger.register_cache(evict_coldest_bake)
+
 class TileMap:
     """
     Object for holding tiles. Build from a JSON file.
 
-    Data is:
+    Data is flat for a map with only a solid main layer:
         pos_str: {kwargs + tile_class}
+
+    or layered, back to front (see TileLayer):
+        {"layers": [{name, parallax, static, solid, wrap, "tiles": {pos_str: {...}}}]}
+
+    The layer named main is TileMap.tiles. It holds the entities, takes
+    add/remove and always scrolls with the camera.
     """
-    def __init__(self, file=None, class_maps=None):
+    def __init__(self, file=None, class_maps=None, journal=False):
         self.tiles = {}
+        self.layers = {MAIN_LAYER: TileLayer(MAIN_LAYER, self.tiles, solid=True)}
+        self._collision_tiles = None
+        self._render_cache = None
+        self._grids = {}
+        self.color_runs = {}
+        self.dirty_chunks = set()
+        self.journal = None
 
         if file:
-            self.load(file, class_maps)
+            self.load(file, class_maps, journal)
 
     def key_to_coord(self, key):
         """
@@ -98,9 +481,209 @@ class TileMap:
         """
         return tuple(map(int, key.split(",")))
 
-    def render(self, target=pgfwb.ui.display, camera=None):
-        for tile in self.tiles.values():
-            tile.render(target, camera=camera)
+    @property
+    def render_cache(self):
+        """
+        Surfs and an (N, 2) pos array for the plain tiles, plus the other
+        objects (entities) that render themselves. Rebuilt after add/remove/load.
+        """
+        if self._render_cache is None:
+            tiles = [x for x in self.tiles.values()
+                     if isinstance(x, Tile) and not isinstance(x, ColorTile)]
+            surfs = np.empty(len(tiles), dtype=object)
+            surfs[:] = [tile.surf for tile in tiles]
+            poses = coords_to_poses([tile.coord for tile in tiles]).reshape(-1, 2)
+            others = [x for x in self.tiles.values() if not isinstance(x, Tile)]
+            self._render_cache = (surfs, poses, others)
+
+        return self._render_cache
+
+    @property
+    def collision_tiles(self):
+        """
+        Tiles of the solid layers by coord, front layers winning. This is
+        tiles itself while main is the only solid layer.
+        """
+        if self._collision_tiles is None:
+            solid = [layer for layer in self.layers.values() if layer.solid]
+            if len(solid) == 1 and solid[0].name == MAIN_LAYER:
+                self._collision_tiles = self.tiles
+            else:
+                self._collision_tiles = {}
+                for layer in solid:
+                    self._collision_tiles.update(layer.tiles)
+
+        return self._collision_tiles
+
+    def add_layer(self, layer, front=False):
+        """Puts layer right behind the main layer, or in front of every layer with front"""
+        layers = [item for item in self.layers.items() if item[0] != layer.name]
+        names = [name for name, _ in layers]
+        idx = len(layers) if front else names.index(MAIN_LAYER)
+        layers.insert(idx, (layer.name, layer))
+        self.layers = dict(layers)
+        self._collision_tiles = None
+        self._grids = {}
+
+        if self.journal:
+            self.journal.append(['layer', layer.name, {
+                'parallax': layer.parallax,
+                'static': layer.static,
+                'solid': layer.solid,
+                'wrap': layer.wrap,
+                'front': front,
+            }])
+
+            # the record rebuilds an empty layer, the tiles it came with follow it
+            for coord, tile in layer.tiles.items():
+                self.journal.append(['add', self.coord_to_key(coord), tile_data(tile), layer.name])
+
+        return layer
+
+    def add_to_layer(self, name, coord, tile_partial):
+        if name == MAIN_LAYER:
+            return self.add(coord, tile_partial)
+
+        layer = self.layers[name]
+        layer.add(coord, tile_partial)
+        if layer.solid:
+            self._collision_tiles = None
+            self._grids = {}
+
+        if self.journal:
+            self.journal.append(['add', self.coord_to_key(coord), tile_data(layer.tiles[coord]), name])
+
+    def remove_from_layer(self, name, coord):
+        if name == MAIN_LAYER:
+            return self.remove(coord)
+
+        layer = self.layers[name]
+        if coord in layer.tiles:
+            layer.remove(coord)
+            if layer.solid:
+                self._collision_tiles = None
+                self._grids = {}
+
+            if self.journal:
+                self.journal.append(['remove', self.coord_to_key(coord), name])
+
+    def chunk_of(self, coord):
+        return (coord[0] // COLOR_RUN_CHUNK, coord[1] // COLOR_RUN_CHUNK)
+
+    def build_color_runs(self, chunk):
+        """
+        Merges the chunk's ColorTiles into (color, rect) runs: same colored
+        neighbors are joined horizontally per row, then rows with the same
+        span and color are joined vertically.
+        """
+        x0, y0 = chunk[0] * COLOR_RUN_CHUNK, chunk[1] * COLOR_RUN_CHUNK
+        runs = []
+        open_runs = {}
+
+        for y in range(y0, y0 + COLOR_RUN_CHUNK):
+            row_runs = {}
+            x = x0
+            while x < x0 + COLOR_RUN_CHUNK:
+                tile = self.tiles.get((x, y))
+                if not isinstance(tile, ColorTile):
+                    x += 1
+                    continue
+
+                color = tuple(pygame.Color(tile.color))
+                start = x
+                while (isinstance(tile := self.tiles.get((x + 1, y)), ColorTile)
+                       and x + 1 < x0 + COLOR_RUN_CHUNK
+                       and tuple(pygame.Color(tile.color)) == color):
+                    x += 1
+
+                key = (start, x, color)
+                if (rect := open_runs.get(key)) is not None:
+                    rect.height += settings.TILESIZE
+                else:
+                    rect = pygame.Rect(coord_to_pos((start, y)), (
+                        (x - start + 1) * settings.TILESIZE,
+                        settings.TILESIZE,
+                    ))
+                    runs.append((color, rect))
+
+                row_runs[key] = rect
+                x += 1
+
+            open_runs = row_runs
+
+        return runs
+
+    def render_color_runs(self, target, camera=None):
+        for chunk in self.dirty_chunks:
+            if runs := self.build_color_runs(chunk):
+                self.color_runs[chunk] = runs
+            else:
+                self.color_runs.pop(chunk, None)
+        self.dirty_chunks.clear()
+
+        scroll = (int(camera.render_scroll.x), int(camera.render_scroll.y)) if camera else (0, 0)
+        offset = (-scroll[0], -scroll[1])
+        display_rect = pgfwb.ui.display_rect
+        first = self.chunk_of(pos_to_coord(scroll))
+        last = self.chunk_of(pos_to_coord((scroll[0] + display_rect.width, scroll[1] + display_rect.height)))
+
+        for chunk in itertools.product(range(first[0], last[0] + 1), range(first[1], last[1] + 1)):
+            for color, rect in self.color_runs.get(chunk, ()):
+                rect = rect.move(offset)
+                if rect.colliderect(display_rect):
+                    pgfwb.render.fill(target, color, rect, Tile.layer)
+
+    def render(self, target=pgfwb.ui.render_queue, camera=None):
+        """
+        Draws the layers back to front. Layers behind main go below the
+        tile render layer, layers in front of it between the entity and
+        UI render layers.
+        """
+        names = list(self.layers)
+        main_idx = names.index(MAIN_LAYER)
+
+        for idx, layer in enumerate(self.layers.values()):
+            if idx < main_idx:
+                layer.render(target, camera, Tile.layer - (main_idx - idx))
+            elif idx == main_idx:
+                self.render_main(target, camera)
+            else:
+                layer.render(target, camera, pgfwb.render.ENTITY_LAYER + (idx - main_idx) / (len(names) - main_idx))
+
+    def render_main(self, target=pgfwb.ui.render_queue, camera=None):
+        if not isinstance(target, pgfwb.render.RenderQueue):
+            for tile in self.tiles.values():
+                tile.render(target, camera=camera)
+            return
+
+        self.render_color_runs(target, camera)
+
+        surfs, dests, others = self.render_cache
+        if camera:
+            dests = camera.offset_many(dests)
+
+        width, height = pgfwb.ui.display.get_size()
+        visible = np.flatnonzero(
+            (dests[:, 0] > -settings.TILESIZE) & (dests[:, 0] < width)
+            & (dests[:, 1] > -settings.TILESIZE) & (dests[:, 1] < height)
+        )
+        target.extend(zip(surfs[visible], dests[visible].tolist()), Tile.layer)
+
+        # entities that describe their draws are offset in one batch too
+        items = []
+        for other in others:
+            if (draw_items := getattr(other, 'draw_items', None)) is None:
+                other.render(target, camera=camera)
+            else:
+                items.extend(draw_items())
+
+        if items:
+            surfs, poses, layers = zip(*items)
+            if camera:
+                poses = camera.offset_many(poses).tolist()
+
+            for surf, pos, layer in zip(surfs, poses, layers):
+                target.submit(surf, pos, layer)
 
     def add(self, coord, tile_partial):
         """
@@ -110,54 +693,125 @@ class TileMap:
         e.g.
         green_tile = functools.partial(ColorTile, color=Green)
         """
+        if isinstance(self.tiles.get(coord), ColorTile):
+            self.dirty_chunks.add(self.chunk_of(coord))
+
         self.tiles[coord] = tile_partial(coord=coord)
+        self._render_cache = None
+        self._collision_tiles = None
+        self._grids = {}
+
+        if isinstance(self.tiles[coord], ColorTile):
+            self.dirty_chunks.add(self.chunk_of(coord))
+
+        if self.journal:
+            self.journal.append(['add', self.coord_to_key(coord), tile_data(self.tiles[coord])])
 
     def remove(self, coord):
         if coord in self.tiles:
-            del self.tiles[coord]
+            if isinstance(self.tiles.pop(coord), ColorTile):
+                self.dirty_chunks.add(self.chunk_of(coord))
+
+            self._render_cache = None
+            self._collision_tiles = None
+            self._grids = {}
 
-    def load(self, file, class_maps=None):
-        class_map = {**tile_class_map}
+            if self.journal:
+                self.journal.append(['remove', self.coord_to_key(coord)])
+
+    def coord_to_key(self, coord):
+        return ",".join(map(str, coord))
+
+    def load(self, file, class_maps=None, journal=False):
+        """
+        With journal=True, edits made through add/remove are appended to
+        a sidecar log (see Journal) instead of requiring a full save, and
+        any existing log is replayed on top of the file.
+        """
+        self.class_map = {**tile_class_map}
         if class_maps:
             for _class_map in class_maps:
-                class_map = {**class_map, **_class_map}
+                self.class_map = {**self.class_map, **_class_map}
             
+        if self.journal:
+            self.journal.close()
+
         self.tiles = {}
-        with open(file) as fp:
-            for key, kwargs in json.load(fp).items():
-                coord = self.key_to_coord(key)
-                tile_class = class_map[kwargs.pop('tile_class')]
-                self.tiles[coord] = tile_class(coord=coord, **kwargs)
+        self.layers = {MAIN_LAYER: TileLayer(MAIN_LAYER, self.tiles, solid=True)}
+        self._collision_tiles = None
+        self._render_cache = None
+        self._grids = {}
+        self.journal = None
+
+        if not journal or os.path.exists(file):
+            with open(file) as fp:
+                data = json.load(fp)
+
+            # flat maps are a lone main layer
+            specs = data['layers'] if 'layers' in data else [{'name': MAIN_LAYER, 'tiles': data}]
+            self.layers = {}
+            for spec in specs:
+                tiles = {self.key_to_coord(key): self.build_tile(key, kwargs)
+                         for key, kwargs in spec['tiles'].items()}
+
+                if spec['name'] == MAIN_LAYER:
+                    self.tiles = tiles
+                    layer = TileLayer(MAIN_LAYER, tiles, solid=spec.get('solid', True))
+                else:
+                    layer = TileLayer(
+                        spec['name'],
+                        tiles,
+                        parallax=spec.get('parallax', 1.0),
+                        static=spec.get('static', False),
+                        solid=spec.get('solid', False),
+                        wrap=spec.get('wrap', False),
+                    )
+                self.layers[spec['name']] = layer
+
+            if MAIN_LAYER not in self.layers:
+                self.layers[MAIN_LAYER] = TileLayer(MAIN_LAYER, self.tiles, solid=True)
+
+        if journal:
+            self.journal = Journal(file, self)
+
+        self.color_runs = {}
+        self.dirty_chunks = {self.chunk_of(coord) for coord, tile in self.tiles.items()
+                             if isinstance(tile, ColorTile)}
+
+    def build_tile(self, key, kwargs):
+        kwargs = {**kwargs}
+        tile_class = self.class_map[kwargs.pop('tile_class')]
+        return tile_class(coord=self.key_to_coord(key), **kwargs)
+
+    def serialize(self, snapshot=None):
+        """
+        The map's JSON data, flat while main is the only layer and solid.
+        snapshot maps layer names to tiles dicts to write instead of the
+        live ones.
+        """
+        if snapshot is None:
+            snapshot = {name: layer.tiles for name, layer in self.layers.items()}
+
+        if list(snapshot) == [MAIN_LAYER] and self.layers[MAIN_LAYER].solid:
+            return {self.coord_to_key(coord): tile_data(tile)
+                    for coord, tile in snapshot[MAIN_LAYER].items()}
+
+        return {'layers': [self.layers[name].data(tiles, self.coord_to_key)
+                           for name, tiles in snapshot.items()]}
 
     def save(self, file):
-        data = {}
-        for coord, tile in self.tiles.items():
-            key = ",".join(map(str, coord))
-            tile_class = tile.__class__.__name__
-
-            keep_fields = (
-                'detect_collision',
-                'destination_str',
-                'behavior_name',
-                'movespeed',
-                'jumpforce',
-                'width',
-                'height',
-                'gravity',
-                'filepath',
-                'folder',
-                'index',
-                'color',
-            )
-            kwargs = {k: v for k, v in tile.__dict__.items()
-                      if k in keep_fields}
-            
-            kwargs['tile_class'] = tile_class
+        """
+        Writes the full map. The write goes to a temp file that is renamed
+        over file, so a crash never leaves a half written map behind.
+        """
+        journaled = self.journal and self.journal.file == file
+        if journaled and self.journal.thread:
+            self.journal.thread.join()
 
-            data[key] = kwargs
+        write_atomic(file, self.serialize())
 
-        with open(file, 'w') as fp:
-            json.dump(data, fp)
+        if journaled:
+            self.journal.reset()
 
     def rects_around(self, pos, key=lambda x: True):
         coord = pos_to_coord(pos)
@@ -166,7 +820,137 @@ class TileMap:
 
         return [tile.rect 
                 for coord in coords 
-                if (tile := self.tiles.get(coord)) and key(tile)]
+                if (tile := self.collision_tiles.get(coord)) and key(tile)]
+
+    def rects_in_many(self, rects, key=lambda x: True):
+        """
+        rects_in for many rects. The corners of every rect are converted to
+        coords in one batch, returns a list of rect lists in the same order.
+        """
+        corners = poses_to_coords([((rect.left, rect.top), (rect.right - 1, rect.bottom - 1))
+                                   for rect in rects]).tolist()
+
+        return [[tile.rect
+                 for x in range(left, right + 1)
+                 for y in range(top, bottom + 1)
+                 if (tile := self.collision_tiles.get((x, y))) and key(tile)]
+                for (left, top), (right, bottom) in corners]
+
+    def rects_in(self, rect, key=lambda x: True):
+        """
+        Rects of the tiles in every cell rect covers. Pass a rect grown by
+        an entity's motion (see PhysicsEntity.reach) to get every candidate
+        along it for a sweep.
+        """
+        left, top = pos_to_coord(rect.topleft)
+        right, bottom = pos_to_coord((rect.right - 1, rect.bottom - 1))
+
+        return [tile.rect
+                for x in range(left, right + 1)
+                for y in range(top, bottom + 1)
+                if (tile := self.collision_tiles.get((x, y))) and key(tile)]
+
+    def solid_grid(self, key=collides):
+        """
+        Dense (width, height) bool array of the coords whose tile key accepts,
+        and the coord of its [0, 0] cell. Cached per key until add/remove/load.
+        """
+        if (grid := self._grids.get(key)) is None:
+            coords = [coord for coord, tile in self.collision_tiles.items() if key(tile)]
+            if coords:
+                coords = np.array(coords, dtype=int)
+                origin = coords.min(axis=0)
+                size = coords.max(axis=0) - origin + 1
+                cells = np.zeros(size, dtype=bool)
+                cells[tuple((coords - origin).T)] = True
+            else:
+                origin, cells = np.zeros(2, dtype=int), np.zeros((0, 0), dtype=bool)
+
+            grid = self._grids[key] = (cells, origin)
+
+        return grid
+
+    def raycast(self, origin, direction, max_dist, key=collides):
+        """
+        Walks the grid cells along the ray (Amanatides & Woo) starting with
+        the cell holding origin. Returns (tile, point, distance) for the
+        first tile key accepts within max_dist pixels, or None.
+        """
+        length = math.hypot(*direction)
+        if not length:
+            return None
+
+        dx, dy = direction[0] / length, direction[1] / length
+        x, y = pos_to_coord(origin)
+        step_x, t_max_x, t_delta_x = ray_axis(origin[0], dx, x)
+        step_y, t_max_y, t_delta_y = ray_axis(origin[1], dy, y)
+        t = 0
+
+        while t <= max_dist:
+            if (tile := self.collision_tiles.get((x, y))) and key(tile):
+                return (tile, (origin[0] + dx * t, origin[1] + dy * t), t)
+
+            if t_max_x < t_max_y:
+                x += step_x
+                t = t_max_x
+                t_max_x += t_delta_x
+            else:
+                y += step_y
+                t = t_max_y
+                t_max_y += t_delta_y
+
+        return None
+
+    def line_of_sight(self, a, b, key=collides):
+        """True when no tile key accepts lies between poses a and b"""
+        direction = (b[0] - a[0], b[1] - a[1])
+        return self.raycast(a, direction, math.hypot(*direction), key) is None
+
+    def raycast_many(self, origins, directions, max_dist, key=collides):
+        """
+        raycast for (N, 2) arrays of origins and directions, stepping every
+        ray at once over solid_grid. Returns (hit, distances, coords): a bool
+        array, the distance to each hit (inf for misses) and the hit coords.
+        """
+        cells, grid_origin = self.solid_grid(key)
+        origins = np.asarray(origins, dtype=float).reshape(-1, 2)
+        directions = np.asarray(directions, dtype=float).reshape(-1, 2)
+        count = len(origins)
+
+        lengths = np.hypot(directions[:, 0], directions[:, 1])
+        lengths[lengths == 0] = np.inf
+        directions = directions / lengths[:, None]
+
+        coords = poses_to_coords(origins)
+        step = np.where(directions >= 0, 1, -1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            boundary = (coords + (step > 0)) * settings.TILESIZE
+            t_max = np.where(directions != 0, (boundary - origins) / directions, np.inf)
+            t_delta = np.where(directions != 0, settings.TILESIZE / np.abs(directions), np.inf)
+
+        t = np.zeros(count)
+        hit = np.zeros(count, dtype=bool)
+        active = np.isfinite(lengths)
+        hit_coords = coords.copy()
+
+        while active.any():
+            cell = coords - grid_origin
+            inside = active & (cell >= 0).all(axis=1) & (cell < cells.shape).all(axis=1)
+            solid = np.zeros(count, dtype=bool)
+            solid[inside] = cells[cell[inside, 0], cell[inside, 1]]
+
+            new_hits = solid & (t <= max_dist)
+            hit |= new_hits
+            hit_coords[new_hits] = coords[new_hits]
+            active &= ~new_hits & (t <= max_dist)
+
+            axis = (t_max[:, 1] <= t_max[:, 0]).astype(int)
+            rows = np.arange(count)
+            t = np.where(active, t_max[rows, axis], t)
+            coords[rows[active], axis[active]] += step[rows[active], axis[active]]
+            t_max[rows[active], axis[active]] += t_delta[rows[active], axis[active]]
+
+        return hit, np.where(hit, t, np.inf), hit_coords
 
 class Camera:
     def __init__(self, target, followx=True, followy=True, follow_rate=30):
@@ -194,6 +978,19 @@ class Camera:
     def offset_pos(self, pos):
         return (pos[0] - self.render_scroll.x, pos[1] - self.render_scroll.y)
 
+    def offset_many(self, rects_or_array):
+        """
+        Screen positions for many objects at once. Takes rects or an
+        (N, 2+) array whose first columns are x and y. Returns an (N, 2)
+        int array.
+        """
+        if isinstance(rects_or_array, np.ndarray):
+            poses = rects_or_array[:, :2]
+        else:
+            poses = np.array([rect[:2] for rect in rects_or_array], dtype=int).reshape(-1, 2)
+
+        return (poses - (int(self.render_scroll.x), int(self.render_scroll.y))).astype(int)
+
     def offset_rect(self, rect):
         rect_copy = rect.copy()
         rect_copy.x -= self.render_scroll.x
@@ -1,20 +1,49 @@
 from collections import deque
+import functools
 
 from settings import *
 import string
 import pygame 
 from pgfwb.utils import (
     quit_handler,
-    keydown,
 )
+from pgfwb import animation, capture, controls, memory, present, render
 
 
-screen = pygame.display.set_mode((WIDTH * DISPLAY_SCALE, HEIGHT * DISPLAY_SCALE))
-screen_rect = screen.get_rect()
+presenter = present.create((WIDTH, HEIGHT), DISPLAY_SCALE)
+# the window surface, None when the backend draws without one
+screen = presenter.screen and memory.track(presenter.screen, 'scratch')
+# where the display lands in the window, kept current by screen_refresh
+screen_rect = presenter.dest()
 
-display = pygame.Surface((WIDTH, HEIGHT))
+display = memory.track(render.prepare(pygame.Surface((WIDTH, HEIGHT))), 'scratch')
 display_rect = display.get_rect()
 
+render_queue = render.RenderQueue()
+
+MENU_BINDINGS = {
+    'confirm': [pygame.K_RETURN],
+    'erase': [pygame.K_BACKSPACE],
+    'up': [pygame.K_UP],
+    'down': [pygame.K_DOWN],
+}
+menu_actions = controls.ActionMap(MENU_BINDINGS)
+
+def takes_keyboard(loop):
+    """
+    For ui loops: syncs menu_actions on entry, and hands the keyboard back
+    to every other ActionMap (the level's) when the loop returns
+    """
+    @functools.wraps(loop)
+    def wrapper(*args, **kwargs):
+        menu_actions.sync()
+        try:
+            return loop(*args, **kwargs)
+        finally:
+            controls.hand_back(menu_actions)
+
+    return wrapper
+
 font = pygame.font.Font('pgfwb/fonts/prstart.ttf', FONTSIZE)
 
 SCROLLING_FPS = 5
@@ -22,14 +51,63 @@ clock = pygame.time.Clock()
 
 def render_text(text):
     """Creates a surf for the text"""
-    return font.render(text, False, 'white')
+    return render.prepare(font.render(text, False, 'white'))
+
+def memory_overlay(pos=(BORDER, BORDER)):
+    """Queues the memory ledger's per category bytes (current/peak) on the UI layer"""
+    for idx, line in enumerate(memory.ledger.report_lines()):
+        render_queue.submit(
+            render_text(line),
+            (pos[0], pos[1] + idx * FONTSIZE),
+            render.UI_LAYER,
+        )
 
 def get_y_pos(idx):
     """Used for calculating the y position of a text line"""
     return FONTSIZE + idx * FONTSIZE
 
+recorder = None
+
+def start_capture(folder, slots=8, mode='png'):
+    """Starts recording every refreshed display frame to folder (see capture.Capture)"""
+    global recorder
+    stop_capture()
+    recorder = capture.Capture(folder, display, slots, mode)
+
+def stop_capture():
+    """Stops recording and returns its stats, None when nothing was recording"""
+    global recorder
+    if recorder is None:
+        return None
+
+    stats, recorder = recorder.close(), None
+    return stats
+
+def to_display(pos):
+    """Window pos (e.g. the mouse) in display coords, None outside screen_rect"""
+    if not screen_rect.collidepoint(pos):
+        return None
+
+    return (
+        (pos[0] - screen_rect.x) * WIDTH // screen_rect.width,
+        (pos[1] - screen_rect.y) * HEIGHT // screen_rect.height,
+    )
+
+def flush():
+    """
+    Draws what is queued on render_queue onto display now. Call it before
+    blitting straight onto display, so those blits end up on top.
+    """
+    render_queue.flush(display)
+
 class screen_refresh:
-    """Context manager for handling screen fill, display flip and clock tick"""
+    """
+    Context manager for handling screen fill, display flip and clock tick.
+
+    render() calls queue on render_queue, which is flushed on exit, after
+    the body; blits made straight onto display in the body end up under
+    them unless the body calls flush first.
+    """
     def __init__(self, framerate=60, fill='black'):
         self.framerate = framerate
         self.fill = fill
@@ -39,11 +117,13 @@ class screen_refresh:
             display.fill(self.fill)
 
     def __exit__(self, *args, **kwargs):
-        screen.blit(
-            pygame.transform.scale(display, screen.get_size()),
-            (0, 0)
-        )
-        pygame.display.flip()
+        global screen_rect
+        flush()
+        if recorder:
+            recorder.grab(display)
+        presenter.present(display)
+        screen_rect = presenter.dest()
+        animation.timeline.advance()
         clock.tick(self.framerate)
 
 
@@ -106,7 +186,7 @@ class Window:
 
         if height is None: height = HEIGHT // 3
 
-        self.surf = pygame.Surface((width, height))
+        self.surf = memory.track(render.prepare(pygame.Surface((width, height))), 'ui')
         self.rect = self.surf.get_rect()
         self.border = self.surf.get_rect()
 
@@ -179,6 +259,7 @@ class Menu(Window):
         super().update()
         self.surf.blit(self.cursor.surf, self.cursor.pos)
 
+@takes_keyboard
 def window(lines, autoreturn=False):
     """Function for instantiating a Window object with a game loop
 
@@ -192,21 +273,23 @@ def window(lines, autoreturn=False):
     window = Window(lines)
 
     while True:
-        for event in pygame.event.get():
+        menu_actions.begin_frame()
+        for event in controls.get_events():
             quit_handler(event)
-            pressed = keydown(event)
+            menu_actions.process(event)
 
-            if pressed(pygame.K_RETURN):
-                return
+        if menu_actions.is_pressed('confirm'):
+            return
 
         window.update()
 
         with screen_refresh(fill=False):
-            display.blit(window.surf, window.rect)
+            render_queue.submit(window.surf, window.rect, render.UI_LAYER)
 
         if autoreturn:
             return
 
+@takes_keyboard
 def scrolling_window(lines, autoreturn=False):
     """Note autoreturn in this function returns when the 
        text lines for the window are filled.
@@ -214,24 +297,26 @@ def scrolling_window(lines, autoreturn=False):
     window = ScrollingWindow(lines)
 
     while True:
-        for event in pygame.event.get():
+        menu_actions.begin_frame()
+        for event in controls.get_events():
             quit_handler(event)
-            pressed = keydown(event)
+            menu_actions.process(event)
 
-            if pressed(pygame.K_RETURN):
-                if window.text_lines.filled:
-                    return
-                else:
-                    window.text_lines.fill()
+        if menu_actions.is_pressed('confirm'):
+            if window.text_lines.filled:
+                return
+            else:
+                window.text_lines.fill()
 
         window.update()
 
         with screen_refresh(framerate=SCROLLING_FPS, fill=False):
-            display.blit(window.surf, window.rect)
+            render_queue.submit(window.surf, window.rect, render.UI_LAYER)
         
         if autoreturn and window.text_lines.filled:
             return
 
+@takes_keyboard
 def menu(options):
     """Function for instantiating a Menu object with a game loop
 
@@ -240,23 +325,24 @@ def menu(options):
     menu = Menu(options)
 
     while True:
-        for event in pygame.event.get():
+        menu_actions.begin_frame()
+        for event in controls.get_events():
             quit_handler(event)
-            pressed = keydown(event)
+            menu_actions.process(event)
 
-            if pressed(pygame.K_RETURN):
-                return menu.cursor.idx
+        if menu_actions.is_pressed('up'):
+            menu.cursor.move_up()
 
-            if pressed(pygame.K_UP):
-                menu.cursor.move_up()
+        if menu_actions.is_pressed('down'):
+            menu.cursor.move_down()
 
-            if pressed(pygame.K_DOWN):
-                menu.cursor.move_down()
+        if menu_actions.is_pressed('confirm'):
+            return menu.cursor.idx
 
         menu.update()
 
         with screen_refresh(fill=False):
-            display.blit(menu.surf, menu.rect)
+            render_queue.submit(menu.surf, menu.rect, render.UI_LAYER)
 
 def confirm(text=None):
     """Convenient function for displaying a window with text and a yes/no menu"""
@@ -265,6 +351,7 @@ def confirm(text=None):
 
     return menu(['YES', 'NO']) == 0
 
+@takes_keyboard
 def prompt(text=None, pos=None, width=None, height=None):
     if text:
         window([text], autoreturn=True)
@@ -281,23 +368,21 @@ def prompt(text=None, pos=None, width=None, height=None):
     ordmap = list(map(ord, string.ascii_lowercase + string.digits + '.,-'))
 
     while True:
-        for event in pygame.event.get():
+        menu_actions.begin_frame()
+        for event in controls.get_events():
             quit_handler(event)
-            pressed = keydown(event)
+            action = menu_actions.process(event)
 
-            if pressed(pygame.K_RETURN):
-                display.fill('black')
-                return ''.join(input_text)
+            if event.type != pygame.KEYDOWN:
+                continue
 
-            if pressed(pygame.K_BACKSPACE):
+            # erasing is applied in order with the typed keys
+            if action == 'erase':
                 if input_text:
                     input_text.pop()
 
                 prompt_window.text_lines = TextLines([''.join(input_text)])
 
-            if event.type != pygame.KEYDOWN:
-                continue
-
             if event.key in ordmap:
                 key = chr(event.key)
                 pressed_keys = pygame.key.get_pressed()
@@ -307,7 +392,11 @@ def prompt(text=None, pos=None, width=None, height=None):
                 input_text.append(key)
                 prompt_window.text_lines = TextLines([''.join(input_text)])
 
+        if menu_actions.is_pressed('confirm'):
+            display.fill('black')
+            return ''.join(input_text)
+
         prompt_window.update()
 
         with screen_refresh(fill=False):
-            display.blit(prompt_window.surf, prompt_window.rect)
+            render_queue.submit(prompt_window.surf, prompt_window.rect, render.UI_LAYER)
@@ -21,7 +21,9 @@ def quit_handler(event):
             for event in pygame.event.get():
                 quit_handler(event)
     """
-    if event.type == pygame.QUIT:
+    # closing a present.RendererPresenter window doesn't quit while the
+    # hidden display module window is still open
+    if event.type in (pygame.QUIT, pygame.WINDOWCLOSE):
         quit_game()
 
 def preserve_keys(*keys):
@@ -42,6 +44,9 @@ def preserve_keys(*keys):
     If we don't do this, we risk having a character continue
     moving in a direction from a KEYDOWN event because the
     cleanup in the KEYUP event was not captured in its scene.
+
+    Scenes using controls.ActionMap call its sync method instead; the
+    platformer Player does it in resume_controls.
     """
     pressed_keys = pygame.key.get_pressed()
 
@@ -52,7 +57,10 @@ def preserve_keys(*keys):
             post(Event(pygame.KEYUP, {'key': key}))
 
 def keydown(event):
-    """Used for creating functions for capturing KEYDOWN events with a key"""
+    """Used for creating functions for capturing KEYDOWN events with a key
+
+    Kept for existing loops, controls.ActionMap dispatches with one lookup.
+    """
     def inner(key):
         return event.type == pygame.KEYDOWN and event.key == key
     return inner